@@ -16,24 +16,38 @@ See LICENSE.txt for the full GPL-3.0 license information.
 See LICENSES directory for licensing of other works included in this project.
 """
 
+import os
 import sys
 import pygame
 import math
 import random
 import asyncio
-import time
+import argparse
 
-from scripts.utils import load_image, load_images, make_states_false, meters_to_pixels as met_pix
-from scripts.screen import Screen
-from scripts.text import how_to_play_text_1, how_to_play_text_2, start_title
+from scripts.utils import make_states_false, meters_to_pixels as met_pix
+from scripts.assets import (load_assets, load_assets_async, split, placeholders, fill, BACKGROUNDS, ASSETS,
+                            LAZY)
+from scripts.screen import Screen, LoadingScreen
+from scripts.text import how_to_play_text_1, how_to_play_text_2, start_title, text_cache, GREEN, BLUE
 from scripts.rocket import Rocket, SCALE
 from scripts.planet import Planet
+from scripts.ephemeris import Ephemeris
+from scripts.simulation import MAX_TIME, read_png_size
 from scripts.sun import Sun
 from scripts.collision_evaluation import find_collision_object
+from scripts.preview import TrajectoryPreview
+from scripts.autopilot import Autopilot
+from scripts.renderer import Renderer
+from scripts.broad_phase import SpatialGrid
+from scripts.replay import LiveInput, Recorder, Playback
+from scripts.profiler import Profiler
+from scripts.hud import Telemetry
+from scripts.launch_windows import LaunchWindows
+from scripts.scenes import SceneManager, Gameplay
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, vsync=False, preload=True):
         pygame.init()
 
         SCREEN_WIDTH = 1024
@@ -42,111 +56,115 @@ class Game:
         self.FPS = 120
         self.target_FPS = 120
 
-        self.prev_time = time.time()
-        self.now = 0
         self.dt = 0
 
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        # Frame pacing. Frames run at FPS while anything moves. When a menu or the pause screen is on top,
+        # nothing changes without input, so frames either wait for an event for up to 1 / idle_FPS seconds, but
+        # never come faster than FPS ('on_demand'), run at idle_FPS ('capped') or run at FPS anyway ('fixed').
+        # Browsers can't wait for events, so 'on_demand' is 'capped' there.
+        self.pacing = 'on_demand'
+        self.idle_FPS = 10
+        self.busy_loop = False  # Holds frames with clock.tick_busy_loop: steadier, but keeps a core busy
+        self.vsync = vsync  # Waits for the display's refresh when updating it. Only set when the window opens
+
+        # Where each frame's dt, mouse position and events come from. See scripts/replay.py
+        self.input = LiveInput()
+
+        # Planet positions are drawn from this, so a session can be replayed from its seed
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.random = random.Random(self.seed)
+
+        # Physics runs in fixed steps of physics_dt, independent of the frame rate. Each frame adds its dt to
+        # accumulator and runs as many steps as fit; alpha is the leftover fraction used to interpolate rendering.
+        self.physics_rate = 120
+        self.physics_dt = 1 / self.physics_rate
+        self.integrator = 'euler'  # 'euler', 'verlet' or 'rk4', see scripts/simulation.py
+        self.max_frame_time = 0.25  # Longest frame simulated in full, so a hitch can't snowball
+        self.accumulator = 0
+        self.alpha = 0
+        self.physics_time = 0  # Seconds of gameplay simulated so far
+
+        # Planet positions and velocities by time, made in initialize_gameplay once the planets' angles are known
+        self.ephemeris = None
+
+        if vsync:
+            try:
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+            except pygame.error:  # Not every display driver can
+                self.vsync = False
+        if not self.vsync:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Planet Hop")
 
         self.clock = pygame.time.Clock()
 
-        # Load background images
-        self.backgrounds = {'stars_bg': load_image(path='background/stars_bg.png', convert='convert_alpha()'),
+        # Everything drawn is built by build() from the images listed in scripts/assets.py. With preload, they
+        # are all loaded here, before the first frame. Otherwise load() loads them from inside the game loop,
+        # drawing its progress, and leaves the assets only needed later to load in the background
+        self.backgrounds = self.assets = None
+        self.lazy_loader = None  # asyncio Task loading those
 
-                            'dark_bg': load_image(path='background/dark_bg.png',
-                                                  convert='convert_alpha()'),
-                            }
+        # Draw the rocket turned to where it is actually heading while flying, instead of the nearest of its
+        # 12 drawn headings
+        self.rotate_rocket = False
 
-        # Load images for screens and the rest of the game
-        self.assets = {'logo': load_image(path='logo/logo.png', convert='convert_alpha()'),
+        # Rockets fired along with the player's, spread evenly around the aim, to show where nearby launches end up.
+        # 0 turns salvos off. See scripts/salvo.py.
+        self.salvo_size = 0
+        self.salvo_spread = math.pi / 12  # Radians either side of the aim
+        self.salvo = None
 
-                       'start_menu': [load_image(path='buttons/start_btn.png', convert='convert()'),
-                                      load_image(path='buttons/how_to_play_btn.png', convert='convert()'),
-                                      load_image(path='buttons/exit_btn.png', convert='convert()')],
+        # Makes course corrections while the rocket flies, planned ahead with salvos of candidate burns. A toggles
+        # it. See scripts/autopilot.py
+        self.autopilot = Autopilot(game=self)
 
-                       'start_menu_hover': [load_image(path='buttons/start_btn_hover.png', convert='convert()'),
-                                            load_image(path='buttons/how_to_play_btn_hover.png', convert='convert()'),
-                                            load_image(path='buttons/exit_btn_hover.png', convert='convert()')],
+        # Faint heat map of the Sun's pull behind the gameplay, built once with the static layers. Needs NumPy
+        self.show_gravity_field = False
 
-                       'pause_menu': [load_image(path='buttons/continue_btn.png', convert='convert()'),
-                                      load_image(path='buttons/main_menu_btn.png', convert='convert()'),
-                                      load_image(path='buttons/exit_btn.png', convert='convert()')],
+        # Predicted flight path drawn while aiming
+        self.show_preview = True
+        self.preview = TrajectoryPreview(game=self)
 
-                       'pause_menu_hover': [load_image(path='buttons/continue_btn_hover.png', convert='convert()'),
-                                            load_image(path='buttons/main_menu_btn_hover.png', convert='convert()'),
-                                            load_image(path='buttons/exit_btn_hover.png', convert='convert()')],
+        # Draws frames over the cached static background, updating only what changed
+        self.renderer = Renderer(game=self)
 
-                       'arrows': [load_image(path='buttons/arrow_right.png', convert='convert()'),
-                                  load_image(path='buttons/arrow_left.png', convert='convert()'),
-                                  load_image(path='buttons/arrow_right_hover.png', convert='convert()'),
-                                  load_image(path='buttons/arrow_left_hover.png', convert='convert()'), ],
+        # Times each phase of the frame while on. F3 shows the overlay, F4 writes the trace to trace_path
+        self.profiler = Profiler(target_fps=self.target_FPS)
+        self.trace_path = 'profile_trace.json'
 
-                       'main_menu_btn': load_image(path='buttons/main_menu_btn.png', convert='convert()'),
+        # Which launches win, by where the planets are, or None without data/launch_windows.bin (see
+        # scripts/launch_windows.py). With it, levels start where some launch wins straight away, and the hint
+        # button shows the best aim. Recordings only replay the same with the same table
+        self.launch_windows = LaunchWindows.load()
+        self.reject_unwinnable = True
+        self.show_hint = False
 
-                       'main_menu_btn_hover': load_image(path='buttons/main_menu_btn_hover.png', convert='convert()'),
+        # Speed, relative speed and distance to the target drawn over the gameplay. F2 toggles it
+        self.show_telemetry = False
+        self.telemetry = Telemetry(game=self)
 
-                       'optimal_launch': load_image(path='how_to_play_screen/2/optimal_launch.png',
-                                                    convert='convert()'),
-
-                       'how_to_move_rocket': load_image(path='how_to_play_screen/1/how_to_move_rocket.png',
-                                                        convert='convert()'),
-
-                       'restart_btn': load_image(path='buttons/restart_btn.png', convert='convert()'),
-
-                       'restart_btn_hover': load_image(path='buttons/restart_btn_hover.png', convert='convert()'),
-
-                       'pause_btn': load_image(path='buttons/pause_btn.png', convert='convert()'),
-
-                       'pause_btn_hover': load_image(path='buttons/pause_btn_hover.png', convert='convert()'),
-
-                       'sun': load_image(path='objects/sun.png', convert='convert()'),
-
-                       'earth': load_image(path='objects/earth.png', convert='convert()'),
-
-                       'mars': load_image(path='objects/mars.png', convert='convert()'),
-
-                       'rocket_rest': load_images(path='rocket/rest', convert='convert()'),
-
-                       'rocket_fly': load_images(path='rocket/fly', convert='convert()'),
-
-                       'rocket_explode': load_image(path='rocket/explode/rocket_explode.png', convert='convert()'),
-
-                       'win_banners': load_images(path='end_screen/win', convert='convert()')[0:3],
-
-                       'lose_banners': load_images(path='end_screen/lose', convert='convert()')[0:3],
+        self.mouse_pos = None
 
-                       'crash_into_sun_banner': load_image(path='end_screen/crash_into_sun_banner.png',
-                                                           convert='convert()'),
+        self.user_won = ['', 0]  # [Planet landed on, velocity difference]
 
-                       'end_banners': load_images(path='end_screen/lose', convert='convert()')[0:3],
+        if preload:
+            self.build(*load_assets(BACKGROUNDS, ASSETS))
 
-                       }
+    def build(self, backgrounds, assets):
+        """
+        Builds the screens, the planets, the Sun and the rocket from the loaded images.
+        """
+        self.backgrounds, self.assets = backgrounds, assets
+        # The end screen starts with the lose banners. Copied, because the end screen swaps banners in and out.
+        self.assets['end_banners'] = self.assets['lose_banners'].copy()
 
-        # Resize images, set alphas
-        self.backgrounds['stars_bg']['img'] = pygame.transform.scale_by(surface=self.backgrounds['stars_bg']['img'],
-                                                                        factor=0.75)
-        self.backgrounds['stars_bg']['img'].set_alpha(200)
-        self.backgrounds['dark_bg']['img'].set_alpha(150)
-        self.backgrounds['dark_bg']['img'] = pygame.transform.scale(
-            surface=self.backgrounds['dark_bg']['img'],
-            size=(1100, 800))
-        self.assets['win_banners'][0]['img'] = pygame.transform.scale(surface=self.assets['win_banners'][0]['img'],
-                                                                      size=(500, 102))
-        self.assets['lose_banners'][0]['img'] = pygame.transform.scale(surface=self.assets['lose_banners'][0]['img'],
-                                                                       size=(500, 102))
-        self.assets['crash_into_sun_banner']['img'] = (
-            pygame.transform.scale(surface=self.assets['crash_into_sun_banner']['img'],
-                                   size=(400, 50)))
-        self.assets['optimal_launch']['img'] = pygame.transform.scale(surface=self.assets['optimal_launch']['img'],
-                                                                      size=(639, 368))
-        self.assets['how_to_move_rocket']['img'] = pygame.transform.scale(
-            surface=self.assets['how_to_move_rocket']['img'],
-            size=(500, 313))
-        self.assets['arrows'] = \
-            [{'path': x['path'], 'img': pygame.transform.scale(surface=x['img'], size=(143, 75))}
-             for x in self.assets['arrows']]
-        self.assets['logo']['img'] = pygame.transform.scale(surface=self.assets['logo']['img'], size=(248, 248))
+        # The hint button is text, and only there with a launch window table
+        hint_button = hint_hover = []
+        if self.launch_windows is not None:
+            hint_button = [{'path': 'buttons/hint_btn', 'img': text_cache.render('HINT', 'fonts/darkstar.ttf', 30,
+                                                                                 GREEN)}]
+            hint_hover = [{'path': 'buttons/hint_btn', 'img': text_cache.render('HINT', 'fonts/darkstar.ttf', 30,
+                                                                                BLUE)}]
 
         # Initialize Screens using self.assets
         self.screens = {'start_menu_screen': Screen(buttons=self.assets['start_menu'],
@@ -173,13 +191,15 @@ class Game:
                         'level_select_screen': None,  # Future feature
 
                         'end_screen': Screen(images=self.assets['end_banners'],
-                                             img_positions=[(262, 80), (367, 192), (367, 238)], game=self),
+                                             img_positions=[(262, 80), (367, 192), (367, 238)], game=self,
+                                             modal=False),
 
                         'restart_and_pause_screen': Screen(buttons=[self.assets['restart_btn'],
-                                                                    self.assets['pause_btn']],
+                                                                    self.assets['pause_btn']] + hint_button,
                                                            hover_buttons=[self.assets['restart_btn_hover'],
-                                                                          self.assets['pause_btn_hover']],
-                                                           btn_positions=[(924, 600), (974, 0)], game=self),
+                                                                          self.assets['pause_btn_hover']] + hint_hover,
+                                                           btn_positions=[(924, 600), (974, 0), (928, 565)],
+                                                           game=self, modal=False),
 
                         'pause_screen': Screen(buttons=self.assets['pause_menu'],
                                                hover_buttons=self.assets['pause_menu_hover'],
@@ -189,9 +209,36 @@ class Game:
 
                         }
 
-        # Initialize Planets
+        # What each button does, by button id (its image's file name). See scripts/screen.py
+        self.screens['start_menu_screen'].handlers = {
+            'start_btn': self.initialize_gameplay,
+            'how_to_play_btn': lambda: self.scenes.set('how_to_play_screen_1'),
+            'exit_btn': self.quit}
+        self.screens['how_to_play_screen_1'].handlers = {
+            'main_menu_btn': lambda: self.scenes.set('start_menu_screen'),
+            'arrow_right': lambda: self.scenes.set('how_to_play_screen_2')}
+        self.screens['how_to_play_screen_2'].handlers = {
+            'main_menu_btn': lambda: self.scenes.set('start_menu_screen'),
+            'arrow_left': lambda: self.scenes.set('how_to_play_screen_1')}
+        self.screens['pause_screen'].handlers = {
+            'continue_btn': self.resume,
+            'main_menu_btn': lambda: self.scenes.set('start_menu_screen'),
+            'exit_btn': self.quit}
+        self.screens['restart_and_pause_screen'].handlers = {
+            'pause_btn': self.pause,
+            'restart_btn': self.initialize_gameplay,
+            'hint_btn': self.toggle_hint}
+
+        # The scenes on screen. Starts at the start menu
+        self.scenes = SceneManager(scenes={'gameplay': Gameplay(game=self),
+                                           **{name: screen for name, screen in self.screens.items()
+                                              if screen is not None}})
+        self.scenes.set('start_menu_screen')
+
+        # Initialize Planets. Earth is drawn at 55x55, but keeps the radius of its 43 pixel image.
         self.planets = {'earth': Planet(name='earth', angle=None, mass=5.9722 * (10 ** 24),
-                                        image=self.assets['earth'], orbit_radius=200, orbit_rate=-0.007, game=self),
+                                        image=self.assets['earth'], orbit_radius=200, orbit_rate=-0.007, game=self,
+                                        radius=(read_png_size('objects/earth.png')[0] - 6) / 2),
 
                         'mars': Planet(name='mars', angle=None, mass=6.39 * (10 ** 23),
                                        image=self.assets['mars'], orbit_radius=met_pix(228000000000, SCALE),
@@ -201,192 +248,293 @@ class Game:
         # Initialize a Sun
         self.sun = Sun(image=self.assets['sun'], mass=1.9891 * (10 ** 30), game=self)
 
+        # Broad phase for collisions, stepped along with the planets. The Sun goes in last, so it is still checked last
+        self.collision_grid = SpatialGrid(locate=lambda body: body.rect.center)
+        for planet in self.planets.values():
+            self.collision_grid.add(planet, planet.radius, speed=planet.orbit_radius * math.fabs(planet.orbit_rate) *
+                                    self.target_FPS * self.physics_dt)
+        self.collision_grid.add(self.sun, self.sun.radius)
+
         # Initialize a Rocket
         self.rocket = Rocket(mass=2 * (10 ** 6), rest_images=self.assets['rocket_rest'],
                              fly_images=self.assets['rocket_fly'], explode_image=self.assets['rocket_explode'],
                              game=self, base_planet=self.planets['earth'], target_planet=self.planets['mars'])
 
-        # Set the possible game states. More than one state can be true at the same time
-        self.state = {'start_menu_screen': True, 'how_to_play_screen_1': False, 'how_to_play_screen_2': False,
-                      'level_select_screen': False, 'end_screen': False, 'restart_and_pause_screen': False,
-                      'gameplay': False, 'pause_screen': False}
-
-        self.mouse_pos = None
-
-        self.user_won = ['', 0]  # [Planet landed on, velocity difference]
-
         pygame.display.set_icon(self.assets['logo']['img'])
 
+    async def load(self):
+        """
+        Loads the assets a few at a time from inside the game loop, drawing a progress bar, and builds the game
+        from them. The assets in LAZY are stood in for by placeholders and keep loading in the background.
+        """
+        eager, lazy = split(ASSETS, LAZY)
+        atlases = {}  # Prebuilt atlases loaded so far, so the background load doesn't decode them again
+        loading = LoadingScreen(surface=self.screen)
+        loading.render(0, 1)
+        await asyncio.sleep(0)  # Shows it
+        backgrounds, assets = await load_assets_async(BACKGROUNDS, eager, progress=loading.render, atlases=atlases)
+        stand_ins = placeholders(lazy)
+        assets.update(stand_ins)
+        self.build(backgrounds, assets)
+        self.lazy_loader = asyncio.create_task(self.load_lazy(lazy, stand_ins, atlases))
+
+    async def load_lazy(self, manifest, stand_ins, atlases):
+        loaded, = await load_assets_async(manifest, atlases=atlases)
+        fill(stand_ins, loaded)
+        self.renderer.full = True  # Frozen screens were drawn with the placeholders
+
     def initialize_gameplay(self):
         """
         Initializes the gameplay. Randomizes planetary positions and
         sets rocket to its initial state, positioning. Sets end_screen state to false
         if applicable and resets it if applicable.
         """
-        make_states_false(self)
-        self.state['stars_screen'] = True
-        self.state['gameplay'] = True
-        self.state['restart_and_pause_screen'] = True
-        for planet in self.planets:
-            self.planets[planet].angle = random.random() * math.pi * 2
+        self.scenes.set('gameplay', 'restart_and_pause_screen')
+        # Draws again, up to 20 times, while no launch could win from where the planets start
+        for _ in range(20):
+            for planet in self.planets:
+                self.planets[planet].angle = self.random.random() * math.pi * 2
+            if (not self.reject_unwinnable or self.launch_windows is None or
+                    self.launch_windows.winnable(self.planets['earth'].angle, self.planets['mars'].angle)):
+                break
+        self.ephemeris = Ephemeris(orbits={name: planet.orbit() for name, planet in self.planets.items()},
+                                   dt=self.physics_dt, frames=round(MAX_TIME / self.physics_dt))
+        self.physics_time = 0
+        for planet in self.planets.values():
+            planet.place(self.physics_time)
+            planet.prev_x, planet.prev_y = planet.x, planet.y
+        self.collision_grid.refile_all()
         self.assets['end_banners'] = self.assets['lose_banners'].copy()
         self.screens['end_screen'].images = self.assets['end_banners']
         self.screens['end_screen'].img_positions = [(262, 80), (367, 192), (367, 238)]
-        self.state['end_screen'] = False
         make_states_false(self.rocket)
         self.rocket.state['positioning'] = True
-
-    def render_gameplay(self):
+        self.rocket.update_image()
+        self.rocket.prev_x, self.rocket.prev_y = self.rocket.x, self.rocket.y
+        self.rocket.impact = None
+        self.accumulator = 0
+        self.dt = 0  # Time spent in menus before this doesn't count as gameplay
+        self.salvo = None
+        self.preview.reset()
+        self.autopilot.reset()
+
+    def pause(self):
+        self.scenes.replace('restart_and_pause_screen', 'pause_screen')
+
+    def resume(self):
+        self.scenes.replace('pause_screen', 'restart_and_pause_screen')
+        self.dt = 0  # Nor time spent paused
+
+    def toggle_hint(self):
+        self.show_hint = not self.show_hint
+
+    def pace(self):
         """
-        Renders the gameplay screen.
+        Holds the frame to the frame rate, see pacing in __init__. Returns how long the next frame may wait
+        for input, in seconds.
         """
-        self.planets['earth'].image['img'] = pygame.transform.scale(surface=self.planets['earth'].image['img'],
-                                                                    size=(55, 55))
-        self.sun.render()
-        pygame.draw.circle(surface=self.screen, color=(72, 216, 232),
-                           center=(self.sun.rect.centerx, self.sun.rect.centery),
-                           radius=self.planets['earth'].orbit_radius, width=1)
-        pygame.draw.circle(surface=self.screen, color=(240, 125, 24),
-                           center=(self.sun.rect.centerx, self.sun.rect.centery),
-                           radius=self.planets['mars'].orbit_radius, width=1)
-        self.planets['earth'].render()
-        self.planets['mars'].render()
-        self.rocket.render()
-
-        # Only updates game if game is not paused
-        if not self.state['pause_screen']:
-            self.planets['earth'].update()
-            self.planets['mars'].update()
-            self.rocket.update()
-
-            # Only checks collision if rocket left base planet
-            if self.rocket.state['left_base_planet']:
-                find_collision_object(self)
+        if not self.input.limit_fps:
+            return 0
+        idle = (self.pacing != 'fixed' and self.scenes.static and not self.profiler.enabled and
+                (self.lazy_loader is None or self.lazy_loader.done()))  # Loading needs the loop to come round
+        on_demand = idle and self.pacing == 'on_demand' and sys.platform != 'emscripten'
+        # Waiting frames still hold to FPS, since every event wakes the wait and the mouse moving sends plenty
+        fps = self.idle_FPS if idle and not on_demand else self.FPS
+        if self.busy_loop:
+            self.clock.tick_busy_loop(fps)
+        else:
+            self.clock.tick(fps)
+        return 1 / self.idle_FPS if on_demand else 0
+
+    def quit(self):
+        self.input.close()
+        text_cache.clear()
+        pygame.quit()
+        sys.exit()
+
+    def update_gameplay(self):
+        """
+        Advances the planets, the rocket and collisions by one physics step.
+        """
+        self.physics_time += self.physics_dt
+        self.planets['earth'].update()
+        self.planets['mars'].update()
+        self.collision_grid.step()
+        self.autopilot.step()
+        self.rocket.update()
+
+        if self.salvo_size and self.salvo is None and self.rocket.state['flying']:
+            self.fire_salvo()
+        if self.salvo is not None:
+            bodies = list(self.planets.values()) + [self.sun]
+            self.salvo.step(centers=[body.rect.center for body in bodies],
+                            velocities=[planet.velocity for planet in self.planets.values()] + [(0, 0)],
+                            h=self.physics_dt * self.target_FPS)
+
+        self.profiler.mark('physics')
+
+        # Only checks collision if rocket left base planet
+        if self.rocket.state['left_base_planet']:
+            find_collision_object(self)
+        self.profiler.mark('collision')
+
+    def fire_salvo(self):
+        """
+        Launches salvo_size rockets from where the rocket launched this step, aimed around its target angle.
+        """
+        from scripts.salvo import Salvo, fan  # NumPy is only loaded once a salvo is fired
+
+        bodies = list(self.planets.values()) + [self.sun]
+        self.salvo = Salvo(x=self.rocket.prev_x, y=self.rocket.prev_y,
+                           target_angles=fan(self.rocket.target_angle, self.salvo_spread, self.salvo_size),
+                           fly_sizes=[image['img'].get_size() for image in self.rocket.fly_images],
+                           masses=[body.mass for body in bodies], radii=[body.radius for body in bodies],
+                           landable=[body is not self.sun for body in bodies],
+                           centers=[body.rect.center for body in bodies],
+                           base=bodies.index(self.rocket.base_planet))
+
+    def step_gameplay(self):
+        """
+        Runs the physics steps that fit in the time since the last frame.
+        """
+        self.accumulator += min(self.dt, self.max_frame_time)
+        while self.accumulator >= self.physics_dt:
+            self.update_gameplay()
+            self.accumulator -= self.physics_dt
+        self.alpha = self.accumulator / self.physics_dt
 
+        if self.show_preview and self.rocket.state['positioning']:
+            self.preview.update()
 
-game = Game()
+    def render_gameplay(self):
+        """
+        Renders the moving parts of the gameplay screen, interpolated between the last two physics steps.
+        The Sun and the orbit rings are part of the renderer's static layer.
+        """
+        self.renderer.add(self.planets['earth'].render(self.alpha))
+        self.renderer.add(self.planets['mars'].render(self.alpha))
+        if self.show_preview and self.rocket.state['positioning']:
+            self.renderer.add(self.preview.render())
+        if self.salvo is not None:
+            self.renderer.add(self.salvo.render(surface=self.screen, alpha=self.alpha,
+                                                target=list(self.planets.values()).index(self.rocket.target_planet)))
+        if self.show_hint and self.rocket.state['positioning'] and self.launch_windows is not None:
+            self.renderer.add(self.render_hint())
+        self.renderer.add(self.rocket.render(self.alpha))
+        if self.autopilot.enabled:
+            self.renderer.add(self.screen.blit(source=text_cache.render('AUTOPILOT', size=22, color=GREEN),
+                                               dest=(10, 10)))
+        if self.show_telemetry:
+            self.renderer.add(self.telemetry.render())
+
+    def render_hint(self):
+        """
+        Draws a line from the rocket along the best aim from its place on the rim. If no aim wins from there,
+        marks the best place on Earth's rim to move to instead. Returns the rect drawn on, if any.
+        """
+        earth_angle = self.ephemeris.angle_at('earth', self.physics_time)
+        mars_angle = self.ephemeris.angle_at('mars', self.physics_time)
+        aim = self.launch_windows.best_aim(earth_angle, mars_angle, self.rocket.angle)
+        if aim is not None:
+            start = self.rocket.rect.center
+            return pygame.draw.line(surface=self.screen, color=BLUE, start_pos=start, width=2,
+                                    end_pos=(start[0] + math.cos(aim) * 80, start[1] + math.sin(aim) * 80))
+        launch = self.launch_windows.best_launch(earth_angle, mars_angle)
+        if launch is None:
+            return None
+        earth = self.planets['earth'].rect
+        reach = earth.width / 2 + 14
+        return pygame.draw.circle(surface=self.screen, color=BLUE, radius=4,
+                                  center=(earth.centerx + math.cos(launch[0]) * reach,
+                                          earth.centery + math.sin(launch[0]) * reach))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Planet Hop')
+    parser.add_argument('--record', metavar='FILE', help='record the session to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='play back the session recorded in FILE')
+    parser.add_argument('--headless', action='store_true',
+                        help='with --replay, play back without a window, as fast as possible')
+    parser.add_argument('--pacing', choices=('on_demand', 'capped', 'fixed'), default='on_demand',
+                        help='how often to draw menus and the pause screen, where nothing moves without input')
+    parser.add_argument('--vsync', action='store_true', help='wait for the display to refresh')
+    return parser.parse_known_args()[0]
 
 
 async def main():
+    if game.assets is None:
+        await game.load()
 
+    timeout = 0
     while True:
-        # Compute delta time
-        game.now = time.time()
-        game.dt = game.now - game.prev_time
-        game.prev_time = game.now
+        game.profiler.begin()
+        frame = game.input.read(timeout)
+        if frame is None:  # The replay ended
+            game.quit()
+        game.dt, game.mouse_pos, events = frame
 
-        game.screen.fill((0, 0, 0))
-        game.screen.blit(source=game.backgrounds['stars_bg']['img'], dest=(-400, 0))
+        for event in events:
+            if event.type == pygame.QUIT:
+                game.quit()
 
-        game.mouse_pos = pygame.mouse.get_pos()
+            if event.type == pygame.WINDOWSIZECHANGED:
+                game.renderer.invalidate()
+            elif event.type == pygame.WINDOWEXPOSED:
+                game.renderer.full = True
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+            if event.type == pygame.MOUSEMOTION:
+                game.scenes.hover(event.pos)
 
             if event.type == pygame.MOUSEBUTTONUP:
-                if game.state['start_menu_screen']:
-                    current_btn = game.screens['start_menu_screen'].current_hover()
-                    if current_btn is None:
-                        break
-                    if game.screens['start_menu_screen'].rects[current_btn['path']].collidepoint(game.mouse_pos):
-                        if current_btn['path'] == 'buttons/start_btn.png':
-                            game.initialize_gameplay()
-                        elif current_btn['path'] == 'buttons/how_to_play_btn.png':
-                            game.state['start_menu_screen'] = False
-                            game.state['how_to_play_screen_1'] = True
-                        elif current_btn['path'] == 'buttons/exit_btn.png':
-                            pygame.quit()
-                            sys.exit()
-
-                elif game.state['how_to_play_screen_1']:
-                    current_btn = game.screens['how_to_play_screen_1'].current_hover()
-                    if current_btn is None:
-                        break
-                    if game.screens['how_to_play_screen_1'].rects[current_btn['path']].collidepoint(game.mouse_pos):
-                        if current_btn['path'] == 'buttons/main_menu_btn.png':
-                            game.state['how_to_play_screen_1'] = False
-                            game.state['start_menu_screen'] = True
-                        elif current_btn['path'] == 'buttons/arrow_right.png':
-                            game.state['how_to_play_screen_1'] = False
-                            game.state['how_to_play_screen_2'] = True
-
-                elif game.state['how_to_play_screen_2']:
-                    current_btn = game.screens['how_to_play_screen_2'].current_hover()
-                    if current_btn is None:
-                        break
-                    if game.screens['how_to_play_screen_2'].rects[current_btn['path']].collidepoint(game.mouse_pos):
-                        if current_btn['path'] == 'buttons/main_menu_btn.png':
-                            game.state['how_to_play_screen_2'] = False
-                            game.state['start_menu_screen'] = True
-                        elif current_btn['path'] == 'buttons/arrow_left.png':
-                            game.state['how_to_play_screen_2'] = False
-                            game.state['how_to_play_screen_1'] = True
-
-                elif game.state['pause_screen']:
-                    current_btn = game.screens['pause_screen'].current_hover()
-                    if current_btn is None:
-                        break
-                    if game.screens['pause_screen'].rects[current_btn['path']].collidepoint(game.mouse_pos):
-                        if current_btn['path'] == 'buttons/continue_btn.png':
-                            game.state['pause_screen'] = False
-                            game.state['restart_and_pause_screen'] = True
-                        elif current_btn['path'] == 'buttons/main_menu_btn.png':
-                            make_states_false(game)
-                            game.state['stars_screen'] = True
-                            game.state['start_menu_screen'] = True
-                        elif current_btn['path'] == 'buttons/exit_btn.png':
-                            pygame.quit()
-                            sys.exit()
-
-                elif game.state['gameplay']:
-                    current_btn = game.screens['restart_and_pause_screen'].current_hover()
-                    if current_btn is not None:
-                        if game.screens['restart_and_pause_screen'].rects[current_btn['path']].collidepoint(
-                                game.mouse_pos):
-                            if current_btn['path'] == 'buttons/pause_btn.png':
-                                game.state['restart_and_pause_screen'] = False
-                                game.state['pause_screen'] = True
-                            elif current_btn['path'] == 'buttons/restart_btn.png':
-                                game.initialize_gameplay()
-                            break
-                    else:
-                        if True in (game.rocket.state['positioning'], game.rocket.state['flying']):
-                            if game.rocket.state['positioning']:
-                                game.rocket.state['positioning'] = False
-                            game.rocket.state['setting_trajectory'] = True
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RIGHT:
-                    if game.rocket.state['positioning']:
-                        game.rocket.movement[0] = True
-                if event.key == pygame.K_LEFT:
-                    if game.rocket.state['positioning']:
-                        game.rocket.movement[1] = True
+                game.scenes.click(game.mouse_pos)
+
+            if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                game.scenes.key(event)
 
             if event.type == pygame.KEYUP:
-                if event.key == pygame.K_RIGHT:
-                    if game.rocket.state['positioning']:
-                        game.rocket.movement[0] = False
-                if event.key == pygame.K_LEFT:
-                    if game.rocket.state['positioning']:
-                        game.rocket.movement[1] = False
-                if event.key == pygame.K_ESCAPE:
-                    if (game.state['start_menu_screen'], game.state['how_to_play_screen_1']) == (False, False):
-                        game.state['pause_screen'] = not game.state['pause_screen']
-                        game.state['restart_and_pause_screen'] = not game.state['restart_and_pause_screen']
-
-        if game.state['gameplay']:
-            game.render_gameplay()
-
-        for screen in game.screens:
-            if game.state[screen]:
-                game.screens[screen].render()
-
-        pygame.display.update()
-        game.clock.tick(game.FPS)
+                if event.key == pygame.K_F2:
+                    game.show_telemetry = not game.show_telemetry
+                if event.key == pygame.K_F3:
+                    game.profiler.toggle()
+                if event.key == pygame.K_F4:
+                    game.profiler.export(game.trace_path)
+        game.profiler.mark('events')
+
+        game.scenes.update()
+        game.profiler.mark('physics')
+
+        scenes = game.renderer.begin()
+        game.profiler.mark('render')
+        for scene in scenes:
+            game.renderer.add(scene.render())
+            game.profiler.mark(scene.phase)
+
+        if game.profiler.enabled:
+            game.renderer.add(game.profiler.render(game.screen))
+            game.profiler.mark('profiler')
+
+        game.renderer.end()
+        game.profiler.mark('display')
+        timeout = game.pace()
+        game.profiler.mark('wait')
+        game.profiler.end()
 
         await asyncio.sleep(0)
 
-asyncio.run(main())
+
+if __name__ == '__main__':
+    args = parse_args()
+    playback = None
+    if args.replay:
+        if args.headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        playback = Playback(args.replay, realtime=not args.headless)
+
+    game = Game(seed=playback.seed if playback is not None else None, vsync=args.vsync, preload=False)
+    game.pacing = args.pacing
+    if playback is not None:
+        game.input = playback
+    elif args.record:
+        game.input = Recorder(args.record, game.seed)
+
+    asyncio.run(main())
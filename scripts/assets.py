@@ -0,0 +1,378 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Asset manifest and loader. Images are decoded and rescaled on a thread pool, and the rescaled
+pixels are cached on disk keyed by a hash of the source file, so later launches skip both.
+Run as python -m scripts.assets to time a cold and a warm load.
+
+The game can also load from inside its event loop (load_assets_async), a few images at a time, so the
+browser build draws a progress bar instead of a blank page. Assets in LAZY are left for after the start
+menu shows: screens are built on placeholders of the right size, and the images are filled in once loaded.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from scripts import atlas
+from scripts.simulation import read_png_size
+
+BASE_IMG_PATH = 'data/images/'
+CACHE_DIR = 'data/cache/'
+
+CACHE_MAGIC = b'PHC1'
+CACHE_HEADER = struct.Struct('<4sIII')  # Magic, width, height, bytes per pixel
+
+
+# Each asset is a spec, or a list of specs for sets of images. path is relative to BASE_IMG_PATH.
+# alpha loads with convert_alpha() instead of convert(). size or scale_by rescale the image.
+# colorkey and set_alpha are applied to the converted image. Images are packed into sprite atlases
+# (see scripts/atlas.py) unless atlas is False or they use set_alpha.
+def frames(path, count, **spec):
+    return [dict(spec, path=path.format(i)) for i in range(1, count + 1)]
+
+
+BACKGROUNDS = {'stars_bg': {'path': 'background/stars_bg.png', 'alpha': True, 'scale_by': 0.75, 'set_alpha': 200,
+                            'atlas': False},
+
+               'dark_bg': {'path': 'background/dark_bg.png', 'alpha': True, 'size': (1100, 800), 'set_alpha': 150,
+                           'atlas': False},
+               }
+
+ASSETS = {'logo': {'path': 'logo/logo.png', 'alpha': True, 'size': (248, 248)},
+
+          'start_menu': [{'path': 'buttons/start_btn.png'},
+                         {'path': 'buttons/how_to_play_btn.png'},
+                         {'path': 'buttons/exit_btn.png'}],
+
+          'start_menu_hover': [{'path': 'buttons/start_btn_hover.png'},
+                               {'path': 'buttons/how_to_play_btn_hover.png'},
+                               {'path': 'buttons/exit_btn_hover.png'}],
+
+          'pause_menu': [{'path': 'buttons/continue_btn.png'},
+                         {'path': 'buttons/main_menu_btn.png'},
+                         {'path': 'buttons/exit_btn.png'}],
+
+          'pause_menu_hover': [{'path': 'buttons/continue_btn_hover.png'},
+                               {'path': 'buttons/main_menu_btn_hover.png'},
+                               {'path': 'buttons/exit_btn_hover.png'}],
+
+          'arrows': [{'path': 'buttons/arrow_right.png', 'size': (143, 75)},
+                     {'path': 'buttons/arrow_left.png', 'size': (143, 75)},
+                     {'path': 'buttons/arrow_right_hover.png', 'size': (143, 75)},
+                     {'path': 'buttons/arrow_left_hover.png', 'size': (143, 75)}],
+
+          'main_menu_btn': {'path': 'buttons/main_menu_btn.png'},
+
+          'main_menu_btn_hover': {'path': 'buttons/main_menu_btn_hover.png'},
+
+          'optimal_launch': {'path': 'how_to_play_screen/2/optimal_launch.png', 'size': (639, 368)},
+
+          'how_to_move_rocket': {'path': 'how_to_play_screen/1/how_to_move_rocket.png', 'size': (500, 313)},
+
+          'restart_btn': {'path': 'buttons/restart_btn.png'},
+
+          'restart_btn_hover': {'path': 'buttons/restart_btn_hover.png'},
+
+          'pause_btn': {'path': 'buttons/pause_btn.png'},
+
+          'pause_btn_hover': {'path': 'buttons/pause_btn_hover.png'},
+
+          'sun': {'path': 'objects/sun.png'},
+
+          # Earth is drawn at 55x55. Its radius still comes from the original image, see Game.__init__.
+          'earth': {'path': 'objects/earth.png', 'size': (55, 55), 'colorkey': (0, 0, 0)},
+
+          'mars': {'path': 'objects/mars.png', 'colorkey': (0, 0, 0)},
+
+          'rocket_rest': frames('rocket/rest/rocket_rest_{:02}.png', 12, colorkey=(255, 255, 255)),
+
+          'rocket_fly': frames('rocket/fly/rocket_fly_{:02}.png', 12, colorkey=(255, 255, 255)),
+
+          'rocket_explode': {'path': 'rocket/explode/rocket_explode.png', 'colorkey': (255, 255, 255)},
+
+          'win_banners': [{'path': 'end_screen/win/1_win_banner.png', 'size': (500, 102)},
+                          {'path': 'end_screen/win/criteria_1_win.png'},
+                          {'path': 'end_screen/win/criteria_2_win.png'}],
+
+          'lose_banners': [{'path': 'end_screen/lose/1_lose_banner.png', 'size': (500, 102)},
+                           {'path': 'end_screen/lose/criteria_1_lose.png'},
+                           {'path': 'end_screen/lose/criteria_2_lose.png'}],
+
+          'crash_into_sun_banner': {'path': 'end_screen/crash_into_sun_banner.png', 'size': (400, 50)},
+          }
+
+
+# Assets only needed once the player gets past the start menu: the how-to-play pages and the end banners
+LAZY = ('how_to_move_rocket', 'optimal_launch', 'arrows', 'win_banners', 'lose_banners', 'crash_into_sun_banner')
+
+
+def image_key(spec):
+    """
+    Returns what makes a decoded and rescaled image unique. Specs that only differ in colorkey or
+    set_alpha share one decode.
+    """
+    return spec['path'], spec.get('alpha', False), spec.get('size'), spec.get('scale_by')
+
+
+def atlas_entry(spec):
+    """
+    Returns how an image is stored in an atlas, or None if it is kept as its own surface.
+    """
+    if not spec.get('atlas', True) or 'set_alpha' in spec:
+        return None
+    return image_key(spec) + (spec.get('colorkey'),)
+
+
+def manifest_specs(manifests):
+    specs = []
+    for manifest in manifests:
+        for asset in manifest.values():
+            specs.extend(asset if isinstance(asset, list) else [asset])
+    return specs
+
+
+def atlas_entries(*manifests):
+    """
+    Returns the atlas entries of every image in the manifests that goes in an atlas.
+    """
+    return list(dict.fromkeys(entry for entry in map(atlas_entry, manifest_specs(manifests)) if entry is not None))
+
+
+def decode(key, cache_dir):
+    """
+    Decodes and rescales one image, or reads it from the cache. Runs on the thread pool, so it
+    doesn't touch the display. Returns an unconverted Surface.
+    """
+    path, alpha, size, scale_by = key
+    with open(BASE_IMG_PATH + path, 'rb') as file:
+        data = file.read()
+
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha1(data)
+        digest.update(repr(key[1:]).encode())
+        cache_path = os.path.join(cache_dir, digest.hexdigest() + '.raw')
+        try:
+            with open(cache_path, 'rb') as file:
+                magic, width, height, depth = CACHE_HEADER.unpack(file.read(CACHE_HEADER.size))
+                pixels = file.read()
+            if magic == CACHE_MAGIC and len(pixels) == width * height * depth:
+                return pygame.image.frombytes(pixels, (width, height), 'RGBA' if depth == 4 else 'RGB')
+        except (OSError, struct.error):
+            pass  # Not cached yet, or unreadable, so decode it
+
+    img = pygame.image.load(io.BytesIO(data), path)
+    if size is not None:
+        img = pygame.transform.scale(surface=img, size=size)
+    elif scale_by is not None:
+        img = pygame.transform.scale_by(surface=img, factor=scale_by)
+
+    if cache_path is not None:
+        pixel_format = 'RGBA' if alpha else 'RGB'
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file first so another launch never reads half a file
+            with open(cache_path + '.tmp', 'wb') as file:
+                file.write(CACHE_HEADER.pack(CACHE_MAGIC, img.get_width(), img.get_height(), len(pixel_format)))
+                file.write(pygame.image.tobytes(img, pixel_format))
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError:
+            pass  # A read-only install still runs, just without the cache
+    return img
+
+
+def plan(manifests, atlases):
+    """
+    Returns the atlas entries in the manifests, the prebuilt atlases (see atlas.load_index) and the keys
+    of the images that go in no atlas, followed by what has to be decoded to load them all. Prebuilt
+    atlases already in atlases ({path: converted Surface}) aren't decoded again.
+    """
+    entries = atlas_entries(*manifests)
+    prebuilt = atlas.load_index(entries)
+
+    # Images to decode: the prebuilt atlases if they are up to date, or else every image that goes in one,
+    # plus the images kept on their own
+    loose = list(dict.fromkeys(image_key(spec) for spec in manifest_specs(manifests) if atlas_entry(spec) is None))
+    keys = list(loose)
+    if prebuilt is not None:
+        keys += [(path, alpha, None, None) for path, alpha, colorkey, rects in prebuilt if path not in atlases]
+    else:
+        keys += [entry[:4] for entry in entries]
+    return entries, prebuilt, loose, list(dict.fromkeys(keys))
+
+
+def assemble(manifests, entries, prebuilt, loose, decoded, atlases):
+    """
+    Converts the decoded images ({key: unconverted Surface}) for the display and builds the dicts
+    load_assets() returns. Prebuilt atlases converted here are added to atlases.
+    """
+    # Converting needs the display, so it happens here on the main thread
+    if prebuilt is not None:
+        areas = {}
+        for path, alpha, colorkey, rects in prebuilt:
+            if path not in atlases:
+                atlases[path] = atlas.convert(decoded[(path, alpha, None, None)], alpha, colorkey)
+            areas.update((entry, (atlases[path], rect)) for entry, rect in rects.items())
+    else:
+        areas = atlas.finish(atlas.build({entry: decoded[entry[:4]] for entry in entries}))
+    converted = {key: decoded[key].convert_alpha() if key[1] else decoded[key].convert() for key in loose}
+
+    def make(spec):
+        entry = atlas_entry(spec)
+        if entry is not None:
+            surface, area = areas[entry]
+            return {'path': spec['path'], 'img': surface.subsurface(area), 'atlas': surface, 'area': area}
+
+        img = converted[image_key(spec)]
+        if 'colorkey' in spec or 'set_alpha' in spec:
+            img = img.copy()
+            if 'colorkey' in spec:
+                img.set_colorkey(spec['colorkey'])
+            if 'set_alpha' in spec:
+                img.set_alpha(spec['set_alpha'])
+        return {'path': spec['path'], 'img': img}
+
+    return [{name: [make(spec) for spec in asset] if isinstance(asset, list) else make(asset)
+             for name, asset in manifest.items()} for manifest in manifests]
+
+
+def load_assets(*manifests, cache_dir=CACHE_DIR, workers=None, atlases=None):
+    """
+    Loads every asset in the manifests and returns one dict per manifest, with the same keys and
+    {'path', 'img'} dicts (or lists of them) as values. Images packed in an atlas also have 'atlas',
+    the shared surface, and 'area', their rect in it; their 'img' is a subsurface of the atlas.
+    Needs the display mode to be set.
+
+    atlases, if given, is a dict of the prebuilt atlases loaded so far, for loads that follow one
+    another: they are reused instead of decoded again, and the ones this load decodes are added.
+    """
+    if atlases is None:
+        atlases = {}
+    entries, prebuilt, loose, keys = plan(manifests, atlases)
+
+    # No threads in the browser build
+    if sys.platform == 'emscripten' or workers == 0:
+        decoded = [decode(key, cache_dir) for key in keys]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            decoded = list(executor.map(decode, keys, [cache_dir] * len(keys)))
+    return assemble(manifests, entries, prebuilt, loose, dict(zip(keys, decoded)), atlases)
+
+
+async def load_assets_async(*manifests, cache_dir=CACHE_DIR, batch_size=4, progress=None, atlases=None):
+    """
+    load_assets() for a running event loop. Images are decoded batch_size at a time, handing control
+    back to the event loop after each batch so frames keep coming. progress(done, total), if given,
+    is called after each batch with the number of images decoded so far.
+    """
+    if atlases is None:
+        atlases = {}
+    entries, prebuilt, loose, keys = plan(manifests, atlases)
+    decoded = {}
+    loop = asyncio.get_running_loop()
+    # Without threads, as in the browser build, each batch is decoded on the event loop itself
+    executor = None if sys.platform == 'emscripten' else ThreadPoolExecutor(max_workers=batch_size)
+    try:
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            if executor is None:
+                images = [decode(key, cache_dir) for key in batch]
+            else:
+                images = await asyncio.gather(*(loop.run_in_executor(executor, decode, key, cache_dir)
+                                                for key in batch))
+            decoded.update(zip(batch, images))
+            if progress is not None:
+                progress(len(decoded), len(keys))
+            await asyncio.sleep(0)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+    return assemble(manifests, entries, prebuilt, loose, decoded, atlases)
+
+
+def split(manifest, names):
+    """
+    Returns the manifest without the assets in names, and a manifest of just those.
+    """
+    return ({name: asset for name, asset in manifest.items() if name not in names},
+            {name: asset for name, asset in manifest.items() if name in names})
+
+
+def placeholder(spec):
+    """
+    Returns a transparent stand-in for an image, the size it will be once loaded, to draw and lay out
+    screens with before the image is.
+    """
+    if 'size' in spec:
+        size = spec['size']
+    else:
+        size = read_png_size(spec['path'])
+        if 'scale_by' in spec:
+            size = (round(size[0] * spec['scale_by']), round(size[1] * spec['scale_by']))
+    return {'path': spec['path'], 'img': pygame.Surface(size, pygame.SRCALPHA)}
+
+
+def placeholders(manifest):
+    return {name: [placeholder(spec) for spec in asset] if isinstance(asset, list) else placeholder(asset)
+            for name, asset in manifest.items()}
+
+
+def fill(placeholders, loaded):
+    """
+    Swaps the loaded images into the placeholder dicts in place, so everything holding a placeholder,
+    like a Screen, draws the image from then on.
+    """
+    for name, asset in loaded.items():
+        if not isinstance(asset, list):
+            placeholders[name].clear()
+            placeholders[name].update(asset)
+            continue
+        for stand_in, image in zip(placeholders[name], asset):
+            stand_in.clear()
+            stand_in.update(image)
+
+
+def time_startup(cache_dir):
+    """
+    Returns the seconds taken by a cold load, which fills cache_dir, and then by a warm one.
+    """
+    times = []
+    for _ in range(2):
+        start = time.perf_counter()
+        load_assets(BACKGROUNDS, ASSETS, cache_dir=cache_dir)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+if __name__ == '__main__':
+    import shutil
+    import tempfile
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1024, 720))
+
+    start = time.perf_counter()
+    load_assets(BACKGROUNDS, ASSETS, cache_dir=None)
+    print(f'No cache: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    cache = tempfile.mkdtemp()
+    try:
+        cold, warm = time_startup(cache)
+    finally:
+        shutil.rmtree(cache)
+    print(f'Cold cache: {cold * 1000:.1f} ms')
+    print(f'Warm cache: {warm * 1000:.1f} ms')
@@ -0,0 +1,183 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Sprite atlases. Images that are drawn the same way (same alpha mode and colorkey) are packed into
+one surface, and each image becomes a named area of it. Run python -m scripts.atlas to prebuild
+the atlases into data/images/atlas/, so startup decodes one PNG per atlas. Without them, the
+atlases are packed in memory at startup instead.
+"""
+
+import hashlib
+import json
+import os
+
+import pygame
+
+BASE_IMG_PATH = 'data/images/'
+ATLAS_DIR = 'atlas/'  # Inside BASE_IMG_PATH
+ATLAS_INDEX = 'atlas.json'
+
+MAX_WIDTH = 1024
+PADDING = 1
+
+
+def group_key(entry):
+    """
+    Returns the (alpha, colorkey) mode an atlas entry is drawn with. Entries are
+    (path, alpha, size, scale_by, colorkey), as made by scripts.assets.atlas_entry.
+    """
+    return entry[1], entry[4]
+
+
+def pack(sizes, max_width=MAX_WIDTH, padding=PADDING):
+    """
+    Packs rectangles into shelves, tallest first. sizes maps names to (width, height).
+    Returns the atlas size and a dict of names to pygame Rects.
+    """
+    rects = {}
+    x = y = shelf_height = width = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0])):
+        if x and x + w > max_width:
+            y += shelf_height + padding
+            x = shelf_height = 0
+        rects[name] = pygame.Rect(x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        width = max(width, x - padding)
+    return (width, y + shelf_height), rects
+
+
+def build(images):
+    """
+    Packs images ({entry: unconverted Surface}) into one atlas per drawing mode.
+    Returns a list of (alpha, colorkey, Surface, {entry: Rect}), with the surfaces not yet converted.
+    """
+    groups = {}
+    for entry in images:
+        groups.setdefault(group_key(entry), []).append(entry)
+
+    atlases = []
+    for (alpha, colorkey), entries in sorted(groups.items(), key=repr):
+        size, rects = pack({entry: images[entry].get_size() for entry in entries})
+        if alpha:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 0))
+        else:
+            surface = pygame.Surface(size)
+            # The gaps are the colorkey, so they stay transparent if an area is ever drawn too big
+            surface.fill(colorkey if colorkey is not None else (0, 0, 0))
+        for entry, rect in rects.items():
+            # Copy the pixels exactly, like convert() or convert_alpha() would, instead of blending them
+            pixel_format = 'RGBA' if alpha else 'RGB'
+            image = pygame.image.frombytes(pygame.image.tobytes(images[entry], pixel_format), rect.size, pixel_format)
+            surface.blit(source=image, dest=rect, special_flags=pygame.BLEND_RGBA_ADD if alpha else 0)
+        atlases.append((alpha, colorkey, surface, rects))
+    return atlases
+
+
+def convert(surface, alpha, colorkey):
+    """
+    Converts an atlas for the display and sets its colorkey.
+    """
+    surface = surface.convert_alpha() if alpha else surface.convert()
+    if colorkey is not None:
+        surface.set_colorkey(colorkey)
+    return surface
+
+
+def finish(atlases):
+    """
+    Converts prepared atlases for the display and sets their colorkeys.
+    Returns {entry: (atlas Surface, area Rect)}.
+    """
+    areas = {}
+    for alpha, colorkey, surface, rects in atlases:
+        surface = convert(surface, alpha, colorkey)
+        for entry, rect in rects.items():
+            areas[entry] = (surface, rect)
+    return areas
+
+
+def source_hash(path):
+    with open(BASE_IMG_PATH + path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def save(atlases):
+    """
+    Writes atlases to data/images/atlas/ with an index of their areas and the hashes of the images in them.
+    """
+    os.makedirs(BASE_IMG_PATH + ATLAS_DIR, exist_ok=True)
+    index = []
+    for i, (alpha, colorkey, surface, rects) in enumerate(atlases):
+        path = f'{ATLAS_DIR}atlas_{i}.png'
+        pygame.image.save(surface, BASE_IMG_PATH + path)
+        index.append({'path': path, 'alpha': alpha, 'colorkey': colorkey,
+                      'entries': [{'entry': list(entry), 'rect': list(rect), 'hash': source_hash(entry[0])}
+                                  for entry, rect in rects.items()]})
+    with open(BASE_IMG_PATH + ATLAS_DIR + ATLAS_INDEX, 'w') as file:
+        json.dump(index, file, indent=1)
+
+
+def load_index(entries):
+    """
+    Returns the prebuilt atlases holding any of entries as a list of (path, alpha, colorkey, {entry: Rect})
+    if they hold every entry, from unchanged source images. Otherwise returns None.
+    """
+    entries = set(entries)
+    try:
+        with open(BASE_IMG_PATH + ATLAS_DIR + ATLAS_INDEX) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    def as_entry(values):
+        path, alpha, size, scale_by, colorkey = values
+        return (path, alpha, tuple(size) if size is not None else None, scale_by,
+                tuple(colorkey) if colorkey is not None else None)
+
+    atlases = []
+    found = set()
+    hashes = {}
+    for atlas in index:
+        if not any(as_entry(item['entry']) in entries for item in atlas['entries']):
+            continue  # Holds none of them, so it isn't decoded
+        rects = {}
+        for item in atlas['entries']:
+            entry = as_entry(item['entry'])
+            if entry[0] not in hashes:
+                try:
+                    hashes[entry[0]] = source_hash(entry[0])
+                except OSError:
+                    return None
+            if hashes[entry[0]] != item['hash']:
+                return None  # An image changed since the atlases were built
+            rects[entry] = pygame.Rect(item['rect'])
+            found.add(entry)
+        colorkey = tuple(atlas['colorkey']) if atlas['colorkey'] is not None else None
+        atlases.append((atlas['path'], atlas['alpha'], colorkey, rects))
+    if not entries <= found:
+        return None
+    return atlases
+
+
+if __name__ == '__main__':
+    from scripts.assets import BACKGROUNDS, ASSETS, LAZY, decode, atlas_entries, split
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+
+    eager, lazy = split(ASSETS, LAZY)
+    eager = atlas_entries(BACKGROUNDS, eager)
+    lazy = [entry for entry in atlas_entries(lazy) if entry not in eager]
+    built = []
+    for entries in (eager, lazy):
+        built += build({entry: decode(entry[:4], cache_dir=None) for entry in entries})
+    save(built)
+    for alpha, colorkey, surface, rects in built:
+        print(f'{len(rects)} images, alpha {alpha}, colorkey {colorkey}: {surface.get_width()}x{surface.get_height()}')
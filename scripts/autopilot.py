@@ -0,0 +1,191 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Autopilot (A in game). While the rocket flies, it keeps planning a course correction a little ahead:
+a copy of the rocket coasts to where it will be lead steps from now, and from there every candidate
+burn, and carrying on without one, is flown as one salvo (scripts/salvo.py) for horizon seconds. When
+the rocket gets there, it makes the burn in the middle of the widest run of burns that landed on the
+target planet slowly enough to count (LANDING_TOLERANCE), or none if it lands already or nothing does.
+Then the next plan starts from wherever the rocket really is.
+
+Planning runs a slice of salvo steps with each physics step, so it costs the same every frame, and lead
+is just long enough for a plan to finish before its burn is due. Being tied to physics steps rather
+than to the clock also keeps recordings replaying the same.
+
+Salvos fly with the 'euler' integrator. With another one, the plans are a little less exact.
+"""
+
+import math
+
+TAU = math.pi * 2
+
+
+def widest_run(wins):
+    """
+    Returns the index in the middle of the longest run of true values in wins, which wraps around, or
+    None if there is none.
+    """
+    count = len(wins)
+    if all(wins):
+        return 0
+    best = best_width = None
+    start = next(index for index in range(count) if not wins[index]) + 1  # A run can't wrap past here
+    width = 0
+    for offset in range(count):
+        index = (start + offset) % count
+        if wins[index]:
+            width += 1
+            if best_width is None or width > best_width:
+                best, best_width = index, width
+        else:
+            width = 0
+    return None if best is None else (best - (best_width - 1) // 2) % count
+
+
+class Plan:
+    """
+    One round of planning, started from the rocket's state at the last physics step. advance() runs it a
+    slice at a time. Once done, angle is the burn to make at burn_step, or None to make none.
+    """
+    def __init__(self, game, angles, lead, horizon):
+        from scripts.salvo import Salvo  # NumPy is only loaded once the autopilot plans
+
+        self.game = game
+        self.rocket = game.rocket
+        self.angles = angles
+        self.lead = lead
+        self.horizon = horizon
+        self.bodies = list(game.planets.values()) + [game.sun]
+        self.target = self.bodies.index(self.rocket.target_planet)
+        self.start = self.step = round(game.physics_time / game.physics_dt) - 1  # Step the salvo is at
+        self.burn_step = self.start + lead + 1  # The physics step that burns, from the state at start + lead
+        self.burns = self.rocket.burns  # A plan is out of date once the rocket burns some other way
+        self.angle = None
+        self.done = False
+
+        self.Salvo = Salvo
+        self.salvo = self.launch(self.rocket.x, self.rocket.y, [], self.rocket.velocity,
+                                 self.rocket.state['left_base_planet'])
+
+    def centers(self, step):
+        """
+        Returns the bodies' centers, as their rects have them, and velocities at a physics step.
+        """
+        centers = []
+        velocities = []
+        for name, planet in self.game.planets.items():
+            x, y, velocity_x, velocity_y = self.game.ephemeris.state(name, step * self.game.physics_dt)
+            width, height = planet.rect.size
+            centers.append((int(x) + width // 2, int(y) + height // 2))
+            velocities.append((velocity_x, velocity_y))
+        return centers + [self.game.sun.rect.center], velocities + [(0, 0)]
+
+    def launch(self, x, y, angles, velocity, left_base):
+        """
+        Returns a salvo at the step the plan is at: the rocket carrying on with velocity and, after it,
+        a rocket burning towards each of angles.
+        """
+        salvo = self.Salvo(x=x, y=y, target_angles=[self.rocket.target_angle] + list(angles),
+                           fly_sizes=[image['img'].get_size() for image in self.rocket.fly_images],
+                           masses=[body.mass for body in self.bodies], radii=[body.radius for body in self.bodies],
+                           landable=[body is not self.game.sun for body in self.bodies],
+                           centers=self.centers(self.step)[0], base=self.bodies.index(self.rocket.base_planet),
+                           left_base=left_base)
+        salvo.vx[0], salvo.vy[0] = velocity
+        return salvo
+
+    def advance(self, steps):
+        """
+        Runs up to steps salvo steps. Returns whether the plan is done.
+        """
+        h = self.game.physics_dt * self.game.target_FPS
+        for _ in range(steps):
+            if self.step < self.start + self.lead:
+                if not self.salvo.active[0]:  # Hits something, or gets lost, before the burn
+                    self.done = True
+                    return True
+            elif len(self.salvo) == 1:
+                # Where the burn will be. Every candidate starts here
+                salvo = self.salvo
+                self.salvo = self.launch(salvo.x[0], salvo.y[0], self.angles, (salvo.vx[0], salvo.vy[0]),
+                                         salvo.left_base[0])
+            elif self.step >= self.start + self.lead + self.horizon or not self.salvo.active.any():
+                self.choose()
+                return True
+            self.step += 1
+            centers, velocities = self.centers(self.step)
+            self.salvo.step(centers=centers, velocities=velocities, h=h)
+        return False
+
+    def choose(self):
+        won = (self.salvo.landed & (self.salvo.hit == self.target)).tolist()
+        if not won[0]:
+            best = widest_run(won[1:])
+            if best is not None:
+                self.angle = self.angles[best]
+        self.done = True
+
+
+class Autopilot:
+    """
+    Plans and makes course corrections while enabled, see the top of this file. candidates burns are
+    tried each plan, spread evenly around the rocket, and slice_steps salvo steps run per physics step.
+    With the defaults, a plan looks 0.4 seconds ahead and planning adds about a millisecond to each
+    physics step.
+    """
+    def __init__(self, game, candidates=96, horizon=3, slice_steps=8):
+        self.game = game
+        self.enabled = False
+        self.candidates = candidates
+        self.horizon = horizon  # Seconds each candidate is flown for
+        self.slice_steps = slice_steps
+        self.plan = None
+        self.burns = 0  # Burns made by the autopilot this level
+        self.plans = 0  # Plans started, for turning the candidates
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.plan = None
+
+    def reset(self):
+        self.plan = None
+        self.burns = 0
+        self.plans = 0
+
+    def step(self):
+        """
+        Runs at each physics step, before the rocket moves: makes the planned burn once it is due, or
+        plans a slice further.
+        """
+        rocket = self.game.rocket
+        if not self.enabled or not rocket.state['flying']:
+            self.plan = None
+            return
+        step = round(self.game.physics_time / self.game.physics_dt)
+        plan = self.plan
+        if plan is not None and (plan.burns != rocket.burns or step >= plan.burn_step):
+            self.plan = None
+            # A click waiting to burn this step goes first
+            if (plan.burns == rocket.burns and step == plan.burn_step and plan.angle is not None and
+                    not rocket.state['setting_trajectory']):
+                rocket.burn(plan.angle)
+                self.burns += 1
+            return
+
+        if self.plan is None:
+            horizon = round(self.horizon / self.game.physics_dt)
+            # Each plan turns the candidates a quarter of the way to the next, so four plans in a row cover four
+            # times as many angles
+            self.plans += 1
+            angles = [(index + self.plans % 4 / 4) * TAU / self.candidates - math.pi
+                      for index in range(self.candidates)]
+            # Long enough for the whole plan to run in slices by the time the burn is due
+            self.plan = Plan(game=self.game, angles=angles, lead=math.ceil((horizon + 1) / (self.slice_steps - 1)),
+                             horizon=horizon)
+        if not self.plan.done:
+            self.plan.advance(self.slice_steps)
@@ -0,0 +1,399 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Vectorized version of scripts/simulation.py. Integrates thousands of launches in lockstep with
+NumPy, one array operation per step for all launches, and reports the same outcomes as
+simulate_launch.
+"""
+
+import math
+
+import numpy as np
+
+from scripts.simulation import (G, SCALE, TARGET_FPS, SCREEN_WIDTH, SCREEN_HEIGHT, BURN_FACTOR, LAUNCH_SPEED,
+                                LANDING_TOLERANCE, MAX_TIME, REST_SPRITES, FLY_SPRITES, SECTORS,
+                                default_world)
+
+NO_HIT = -1
+LOST = -2  # Working marker for launches that have escaped the Sun
+
+ESCAPE_CHECK_FRAMES = 30
+
+
+def _sectors(angles, ceil=False):
+    """
+    Returns which pi / 12 wide sector each angle falls in, using the same comparisons as the
+    scalar code so angles on a boundary land on the same side.
+    """
+    step = math.pi / 12
+    sector = np.floor(angles / step)
+    if ceil:
+        # Sectors closed on the top, (k - 1, k]
+        sector = np.ceil(angles / step)
+        sector -= angles <= step * (sector - 1)
+        sector += angles > step * sector
+    else:
+        # Sectors closed on the bottom, [k, k + 1)
+        sector -= angles < step * sector
+        sector += angles >= step * (sector + 1)
+    return sector.astype(np.int64)
+
+
+def rim_sprites(angles):
+    """
+    Vectorized scripts.simulation.rim_sprite. 2pi counts as 0.
+    """
+    sprites = np.array([sprite for sprite, _ in REST_SPRITES])
+    rims = np.array([rim for _, rim in REST_SPRITES])
+    sector = _sectors(angles) % SECTORS
+    return sprites[sector], rims[sector]
+
+
+def fly_sprite_indices(target_angles):
+    """
+    Vectorized scripts.simulation.fly_sprite_index, for angles in [-pi, pi].
+    """
+    return np.array(FLY_SPRITES)[_sectors(target_angles, ceil=True) + len(FLY_SPRITES) // 2]
+
+
+def collision_mask(rleft, rtop, width, height, center_x, center_y, radius):
+    """
+    Vectorized scripts.simulation.collision. Returns a boolean array, True where the rectangle
+    touches the circle.
+    """
+    rright, rbottom = rleft + width, rtop + height
+    hit = ~((rright < center_x - radius) | (rleft > center_x + radius) |
+            (rbottom < center_y - radius) | (rtop > center_y + radius))
+
+    # Only look closer at the rectangles that passed the bounding box test
+    near = np.nonzero(hit)[0]
+    if near.size:
+        left, top, right, bottom = rleft[near], rtop[near], rright[near], rbottom[near]
+        cx = center_x[near] if np.ndim(center_x) else center_x
+        cy = center_y[near] if np.ndim(center_y) else center_y
+        r = radius[near] if np.ndim(radius) else radius
+        touching = ((left <= cx) & (cx <= right) & (top <= cy) & (cy <= bottom))
+        # Corners and centers sit on whole or half pixels, so comparing squares is exact and skips hypot
+        for x in (left - cx, right - cx):
+            for y in (top - cy, bottom - cy):
+                touching |= x * x + y * y <= r * r
+        hit[near] = touching
+    return hit
+
+
+def sweep_fractions(prev_left, prev_top, rleft, rtop, width, height, prev_center_x, prev_center_y, center_x, center_y,
+                    radius):
+    """
+    Vectorized scripts.simulation.sweep. Returns the fraction of the step at which each rectangle
+    first touches its circle, or inf where it never does.
+    """
+    # Boxes swept by the rectangle and the circle that do not intersect are never touching
+    apart = ((np.maximum(prev_left, rleft) + width < np.minimum(prev_center_x, center_x) - radius) |
+             (np.minimum(prev_left, rleft) > np.maximum(prev_center_x, center_x) + radius) |
+             (np.maximum(prev_top, rtop) + height < np.minimum(prev_center_y, center_y) - radius) |
+             (np.minimum(prev_top, rtop) > np.maximum(prev_center_y, center_y) + radius))
+
+    # The circle's center relative to the rectangle's top left corner, c + s * d
+    cx, cy = prev_center_x - prev_left, prev_center_y - prev_top
+    dx, dy = (center_x - rleft) - cx, (center_y - rtop) - cy
+    first = np.full(np.shape(cx), np.inf)
+    touching = np.zeros(np.shape(cx), dtype=bool)
+
+    a = dx * dx + dy * dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for x in (0, width):
+            for y in (0, height):
+                ex, ey = x - cx, y - cy
+                c = ex * ex + ey * ey - radius * radius
+                touching |= c <= 0
+                b = -2 * (ex * dx + ey * dy)
+                discriminant = b * b - 4 * a * c
+                s = (-b - np.sqrt(np.maximum(discriminant, 0))) / (2 * a)
+                s = np.where((a != 0) & (discriminant >= 0) & (0 <= s) & (s <= 1), s, np.inf)
+                np.minimum(first, s, out=first)
+
+        low = np.zeros(np.shape(cx))
+        high = np.ones(np.shape(cx))
+        for start, delta, size in ((cx, dx, width), (cy, dy, height)):
+            moving = delta != 0
+            enter, leave = -start / delta, (size - start) / delta
+            enter, leave = np.minimum(enter, leave), np.maximum(enter, leave)
+            low = np.where(moving, np.maximum(low, enter), low)
+            high = np.where(moving, np.minimum(high, leave), high)
+            outside = ~moving & ~((0 <= start) & (start <= size))
+            low = np.where(outside, 1, low)
+            high = np.where(outside, 0, high)
+    first = np.where((low <= high) & (low < first), low, first)
+    first[touching] = 0
+    first[apart] = np.inf
+
+    # Rounding can miss a hit that collision itself finds at the end of the step
+    missed = np.isinf(first)
+    if missed.any():
+        first[missed & collision_mask(rleft, rtop, width, height, center_x, center_y, radius)] = 1
+    return first
+
+
+class BatchResult:
+    """
+    Per-launch outcomes. hit holds an index into bodies, or NO_HIT if the rocket was still flying
+    after max_frames. time is the moment of impact in seconds, NaN without a hit. velocity_diff is
+    (launches, 2) and is zero for launches that did not land on a planet.
+    """
+    def __init__(self, bodies, target, hit, frame, landed, velocity_diff, time):
+        self.bodies = bodies
+        self.hit = hit
+        self.frame = frame
+        self.time = time
+        self.landed = landed
+        self.won = landed & (hit == bodies.index(target))
+        self.velocity_diff = velocity_diff
+
+    def __len__(self):
+        return len(self.hit)
+
+    def body_names(self):
+        return [self.bodies[i] if i != NO_HIT else None for i in self.hit]
+
+    def counts(self):
+        """
+        Returns how many launches ended on each body, plus None for launches lost in space.
+        """
+        counts = {name: int(np.count_nonzero(self.hit == i)) for i, name in enumerate(self.bodies)}
+        counts[None] = int(np.count_nonzero(self.hit == NO_HIT))
+        return counts
+
+
+def simulate_launches(earth_angles, mars_angles, rim_angles, target_angles, dt=1 / TARGET_FPS,
+                      max_frames=None):
+    """
+    Simulates every launch described by the (broadcast) angle arrays and returns a BatchResult.
+    Arguments have the same meaning as in scripts.simulation.simulate_launch, max_frames defaulting
+    to MAX_TIME seconds of steps of dt as there.
+
+    Integrates with the 'euler' integrator. Results match simulate_launch except for the odd launch
+    on a chaotic path, where rounding differences between NumPy and the math module grow into a
+    different outcome.
+    """
+    if max_frames is None:
+        max_frames = round(MAX_TIME / dt)
+    earth_angles, mars_angles, rim_angles, target_angles = (
+        angles.ravel() for angles in np.broadcast_arrays(
+            *(np.asarray(angles, dtype=np.float64) for angles in (earth_angles, mars_angles, rim_angles,
+                                                                   target_angles))))
+    count = earth_angles.size
+
+    world = default_world()
+    planets = list(world.planets.values())
+    bodies = planets + [world.sun]
+    names = [body.name for body in bodies]
+    base = names.index(world.base_planet)
+    planet_count = len(planets)
+    h = dt * TARGET_FPS
+
+    # Per body constants, as (bodies, 1) columns so they broadcast against (bodies, launches) blocks
+    def column(values):
+        return np.array(values, dtype=np.float64)[:, None]
+
+    orbit_radius = column([planet.orbit_radius for planet in planets])
+    offset_x = column([SCREEN_WIDTH / 2 - planet.width / 2 for planet in planets])
+    offset_y = column([SCREEN_HEIGHT / 2 - planet.height / 2 for planet in planets])
+    half_w = column([planet.width // 2 for planet in planets])
+    half_h = column([planet.height // 2 for planet in planets])
+    turn_cos = column([math.cos(planet.orbit_rate * h) for planet in planets])
+    turn_sin = column([math.sin(planet.orbit_rate * h) for planet in planets])
+    radius = column([body.radius for body in bodies])
+    # Acceleration towards a body is G * M / d**2 with d in meters, added straight to a velocity in pixels
+    gm = column([G * body.mass / SCALE ** 2 * h for body in bodies])
+    # Furthest a body's center moves in a step, counting the rect's truncation
+    body_step = column([body.orbit_radius * math.fabs(body.orbit_rate) * h + 1 for body in bodies])
+
+    # Planets are rotated by a fixed angle every frame instead of calling cos and sin again
+    cos_angle = np.stack([np.cos(earth_angles), np.cos(mars_angles)])
+    sin_angle = np.stack([np.sin(earth_angles), np.sin(mars_angles)])
+    angle0 = np.stack([earth_angles, mars_angles])
+    sun_cx = int(world.sun.x) + world.sun.width // 2
+    sun_cy = int(world.sun.y) + world.sun.height // 2
+
+    # Body centers, with a fixed last row for the Sun
+    body_cx = np.empty((len(bodies), count))
+    body_cy = np.empty((len(bodies), count))
+    body_cx[planet_count] = sun_cx
+    body_cy[planet_count] = sun_cy
+
+    def place_planets():
+        np.trunc(cos_angle * orbit_radius + offset_x, out=body_cx[:planet_count])
+        np.trunc(sin_angle * orbit_radius + offset_y, out=body_cy[:planet_count])
+        body_cx[:planet_count] += half_w
+        body_cy[:planet_count] += half_h
+
+    place_planets()
+
+    # Position advances at BURN_FACTOR times the velocity, so the Sun's pull on the position is
+    # BURN_FACTOR times its acceleration. In pixels per frame.
+    mu_sun = BURN_FACTOR * G * world.sun.mass / SCALE ** 2
+    escape_radius = max(planet.orbit_radius for planet in planets) + 100
+
+    # Rocket, positioned on the base planet's rim
+    rest_sizes = np.array(world.rocket.rest_sizes, dtype=np.float64)
+    fly_sizes = np.array(world.rocket.fly_sizes, dtype=np.float64)
+    max_rocket_size = max(rest_sizes.max(), fly_sizes.max())
+    sprites, rims = rim_sprites(rim_angles)
+    rest_w, rest_h = rest_sizes[sprites].T
+    base_w, base_h = planets[base].width, planets[base].height
+    base_x = np.trunc(cos_angle[base] * orbit_radius[base] + offset_x[base])
+    base_y = np.trunc(sin_angle[base] * orbit_radius[base] + offset_y[base])
+    r_x = (np.cos(rims) * (base_w / 2 + 3) + base_w / 2 - rest_w / 2) + base_x
+    r_y = (np.sin(rims) * (base_h / 2 + 3) + base_h / 2 - rest_h / 2) + base_y
+    r_w, r_h = fly_sizes[fly_sprite_indices(target_angles)].T
+    vx = LAUNCH_SPEED * np.cos(target_angles)
+    vy = LAUNCH_SPEED * np.sin(target_angles)
+    # Rect size from the previous frame. The first frame still uses the rest image.
+    prev_w, prev_h = rest_w, rest_h
+    left_base = np.zeros(count, dtype=bool)
+
+    # Results, filled in as launches finish
+    hit = np.full(count, NO_HIT, dtype=np.int8)
+    frame = np.zeros(count, dtype=np.int32)
+    impact_time = np.full(count, np.nan)
+    landed = np.zeros(count, dtype=bool)
+    velocity_diff = np.zeros((count, 2))
+    index = np.arange(count)
+    active = np.ones(count, dtype=bool)
+    finished_count = 0
+    elapsed = 0  # Summed like World.time, so impact times match scripts.simulation exactly
+
+    for n in range(1, max_frames + 1):
+        if not active.any():
+            break
+        elapsed += dt
+
+        # Planets
+        prev_cx, prev_cy = body_cx.copy(), body_cy.copy()
+        cos_angle, sin_angle = (cos_angle * turn_cos - sin_angle * turn_sin,
+                                sin_angle * turn_cos + cos_angle * turn_sin)
+        place_planets()
+
+        # Rocket, pulled at its center. The sprite size and the rect used for leaving the base are
+        # the ones from the previous frame.
+        dx = body_cx - (r_x + prev_w / 2)
+        dy = body_cy - (r_y + prev_h / 2)
+        distance = dx * dx + dy * dy
+        np.maximum(distance, 1e-12, out=distance)
+        np.sqrt(distance, out=distance)
+        pull = gm / (distance * distance * distance)
+        dx *= pull
+        dy *= pull
+        prev_vx, prev_vy = vx.copy(), vy.copy()
+        for i in range(len(bodies)):
+            vx += dx[i]
+            vy += dy[i]
+
+        prev_rx, prev_ry = r_x, r_y
+        r_x = r_x + BURN_FACTOR * vx * h
+        r_y = r_y + BURN_FACTOR * vy * h
+
+        # Only rockets within the leaving radius plus their own size can still be touching the base planet
+        if not left_base.all():
+            leaving = np.nonzero(~left_base & (distance[base] <= radius[base, 0] + 30 + max_rocket_size))[0]
+            left_base[:] = True
+            left_base[leaving] = ~collision_mask(np.trunc(prev_rx[leaving]), np.trunc(prev_ry[leaving]),
+                                                 prev_w[leaving], prev_h[leaving],
+                                                 body_cx[base][leaving], body_cy[base][leaving], radius[base, 0] + 30)
+        prev_w, prev_h = r_w, r_h
+
+        # Collisions, swept over the step. Only rockets within their own size plus this frame's movement of
+        # the rocket and the body can touch it.
+        reach = radius + body_step + (max_rocket_size + 2 + BURN_FACTOR * h * (np.abs(vx) + np.abs(vy)))
+        near_body, near = np.nonzero((distance <= reach) & (left_base & active))
+        current = np.full(index.size, NO_HIT, dtype=np.int8)
+        fraction = np.full(index.size, np.inf)
+        if near.size:
+            first = sweep_fractions(np.trunc(prev_rx[near]), np.trunc(prev_ry[near]), np.trunc(r_x[near]),
+                                    np.trunc(r_y[near]), r_w[near], r_h[near],
+                                    prev_cx[near_body, near], prev_cy[near_body, near],
+                                    body_cx[near_body, near], body_cy[near_body, near], radius[near_body, 0])
+            touching = np.nonzero(np.isfinite(first))[0]
+            if touching.size:
+                # The first body touched wins. Of bodies touched at the same moment, find_collision_object
+                # checks the Sun last and the last one wins, which is the highest index.
+                order = np.lexsort((-near_body[touching], first[touching], near[touching]))
+                launches, firsts = np.unique(near[touching][order], return_index=True)
+                chosen = touching[order[firsts]]
+                current[launches] = near_body[chosen]
+                fraction[launches] = first[chosen]
+
+        # Rockets past the outer orbit moving away with more than escape energy can never come back.
+        # They end as lost in space, exactly like running them to max_frames would.
+        if not n % ESCAPE_CHECK_FRAMES:
+            rx = r_x - sun_cx
+            ry = r_y - sun_cy
+            ux = BURN_FACTOR * vx
+            uy = BURN_FACTOR * vy
+            r = np.hypot(rx, ry)
+            escaping = (r > escape_radius) & (rx * ux + ry * uy > 0) & ((ux * ux + uy * uy) / 2 > mu_sun / r)
+            current[escaping & active & (current == NO_HIT)] = LOST
+
+        done = np.nonzero(current != NO_HIT)[0]
+        if done.size:
+            finished = index[done]
+            body = current[done]
+            hit[finished] = np.where(body == LOST, NO_HIT, body)
+            frame[finished] = np.where(body == LOST, max_frames, n)
+            impact_time[finished] = np.where(body == LOST, np.nan, elapsed - dt * (1 - fraction[done]))
+
+            on_planet = np.nonzero((body >= 0) & (body < planet_count))[0]
+            if on_planet.size:
+                rows = body[on_planet]
+                cols = done[on_planet]
+                launches = finished[on_planet]
+                # Exact velocities in pixels per second at the moment of impact, as scripts.ephemeris gives them
+                # for the planets, and interpolated between the steps for the rocket as in find_collision
+                s = fraction[cols]
+                angular_velocity = np.array([planet.orbit_rate * TARGET_FPS for planet in planets])[rows]
+                angle = angle0[rows, launches] + angular_velocity * impact_time[launches]
+                speed = orbit_radius[rows, 0] * angular_velocity
+                prev_raw_x = BURN_FACTOR * TARGET_FPS * prev_vx[cols]
+                prev_raw_y = BURN_FACTOR * TARGET_FPS * prev_vy[cols]
+                raw_x = prev_raw_x + (BURN_FACTOR * TARGET_FPS * vx[cols] - prev_raw_x) * s
+                raw_y = prev_raw_y + (BURN_FACTOR * TARGET_FPS * vy[cols] - prev_raw_y) * s
+                diff_x = np.abs(raw_x + np.sin(angle) * speed)
+                diff_y = np.abs(raw_y - np.cos(angle) * speed)
+                landed[launches] = (diff_x <= LANDING_TOLERANCE) & (diff_y <= LANDING_TOLERANCE)
+                velocity_diff[launches] = np.column_stack((diff_x, diff_y))
+
+            active[done] = False
+            finished_count += done.size
+
+        # Drop finished launches from the working arrays once enough have piled up. Until then
+        # they keep being integrated but are masked out of the results.
+        if finished_count > index.size // 4:
+            keep = np.nonzero(active)[0]
+            index = index[keep]
+            # take keeps the blocks C-contiguous, which boolean indexing along axis 1 does not
+            cos_angle, sin_angle = cos_angle.take(keep, axis=1), sin_angle.take(keep, axis=1)
+            body_cx, body_cy = body_cx.take(keep, axis=1), body_cy.take(keep, axis=1)
+            r_x, r_y, vx, vy = r_x[keep], r_y[keep], vx[keep], vy[keep]
+            r_w, r_h, prev_w, prev_h = r_w[keep], r_h[keep], prev_w[keep], prev_h[keep]
+            left_base = left_base[keep]
+            active = active[keep]
+            finished_count = 0
+
+    frame[index[active]] = max_frames
+    return BatchResult(bodies=names, target=world.target_planet, hit=hit, frame=frame, landed=landed,
+                       velocity_diff=velocity_diff, time=impact_time)
+
+
+def sweep(earth_angle, mars_angle, rim_angle, target_angles=None, resolution=360, **kwargs):
+    """
+    Simulates one starting configuration for every launch angle in target_angles
+    (by default resolution angles evenly spaced around the circle).
+    """
+    if target_angles is None:
+        target_angles = np.linspace(-math.pi, math.pi, resolution, endpoint=False)
+    return simulate_launches(earth_angle, mars_angle, rim_angle, target_angles, **kwargs)
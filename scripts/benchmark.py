@@ -0,0 +1,168 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Benchmarks. Run python -m scripts.benchmark.
+"""
+
+import math
+import random
+import time
+
+from scripts.broad_phase import SpatialGrid
+from scripts.simulation import (SCREEN_WIDTH, SCREEN_HEIGHT, Body, body_center, collision, launch, new_launch_world,
+                                place_planets, step)
+
+
+def belt(count, seed=0):
+    """
+    Returns count small bodies on random circular orbits around the middle of the screen, like an
+    asteroid belt, with the Sun last.
+    """
+    rng = random.Random(seed)
+    bodies = [Body(name=f'asteroid_{i}', mass=10 ** 20, size=(12, 12), radius=3 + rng.random() * 3,
+                   orbit_radius=rng.uniform(80, 340), orbit_rate=rng.uniform(-0.01, 0.01),
+                   angle=rng.uniform(0, math.pi * 2)) for i in range(count - 1)]
+    bodies.append(Body(name='sun', mass=1.9891 * (10 ** 30), size=(94, 94), radius=44))
+    return bodies
+
+
+def time_collisions(count, frames=600, broad_phase=True, seed=0):
+    """
+    Moves count bodies along their orbits and a rocket-sized rect across the screen for frames frames,
+    checking for collisions each frame like find_collision does. Returns the average seconds per frame
+    spent keeping the grid up to date and spent finding collisions, and the number of hits.
+    """
+    bodies = belt(count, seed)
+    grid = SpatialGrid(locate=body_center)
+    for body in bodies:
+        grid.add(body, body.radius, speed=body.orbit_radius * math.fabs(body.orbit_rate))
+
+    upkeep = checks = 0
+    hits = 0
+    for frame in range(frames):
+        for body in bodies[:-1]:
+            body.angle += body.orbit_rate
+            body.place()
+
+        start = time.perf_counter()
+        if broad_phase:
+            grid.step()
+        upkeep += time.perf_counter() - start
+
+        left = frame * SCREEN_WIDTH / frames
+        top = SCREEN_HEIGHT / 2 + math.sin(frame / 40) * 250
+        start = time.perf_counter()
+        candidates = grid.query(left, top, left + 18, top + 27) if broad_phase else bodies
+        hit = None
+        for body in candidates:
+            if collision(rleft=left, rtop=top, width=18, height=27,
+                         center_x=body.centerx, center_y=body.centery, radius=body.radius):
+                hit = body
+        checks += time.perf_counter() - start
+        hits += hit is not None
+    return upkeep / frames, checks / frames, hits
+
+
+def collision_scaling(counts=(3, 10, 30, 100, 300, 1000), frames=600):
+    """
+    Prints the per-frame collision cost with and without the broad phase as the number of bodies grows.
+    """
+    print(f'{"bodies":>7} {"all bodies":>12} {"grid upkeep":>12} {"grid checks":>12} {"hits":>6}')
+    for count in counts:
+        _, brute, brute_hits = time_collisions(count, frames, broad_phase=False)
+        upkeep, checks, hits = time_collisions(count, frames, broad_phase=True)
+        assert hits == brute_hits
+        print(f'{count:>7} {brute * 1e6:>9.1f} us {upkeep * 1e6:>9.1f} us {checks * 1e6:>9.1f} us {hits:>6}')
+
+
+def time_salvo(count, frames=240, seed=0):
+    """
+    Returns the average seconds per physics step for a salvo of count rockets, and for stepping
+    as many single-rocket worlds one at a time.
+    """
+    from scripts.salvo import Salvo, fan
+
+    rng = random.Random(seed)
+    angles = [rng.uniform(0, math.pi * 2) for _ in range(3)]
+    target_angles = fan(rng.uniform(-math.pi, math.pi), math.pi / 12, count)
+
+    world = new_launch_world(*angles)
+    bodies = world.bodies()
+    salvo = Salvo(x=world.rocket.x, y=world.rocket.y, target_angles=target_angles, fly_sizes=world.rocket.fly_sizes,
+                  masses=[body.mass for body in bodies], radii=[body.radius for body in bodies],
+                  landable=[body is not world.sun for body in bodies],
+                  centers=[(body.centerx, body.centery) for body in bodies], base=0)
+    start = time.perf_counter()
+    for frame in range(1, frames + 1):
+        place_planets(world, frame * world.ephemeris.dt)
+        salvo.step(centers=[(body.centerx, body.centery) for body in bodies],
+                   velocities=[body.velocity for body in bodies], h=1)
+    vectorized = (time.perf_counter() - start) / frames
+
+    worlds = []
+    for target_angle in target_angles.tolist():
+        worlds.append(new_launch_world(*angles))
+        launch(worlds[-1], target_angle)
+    start = time.perf_counter()
+    for _ in range(frames):
+        for world in worlds:
+            step(world)
+    one_by_one = (time.perf_counter() - start) / frames
+    return vectorized, one_by_one
+
+
+def salvo_scaling(counts=(1, 10, 100, 300, 1000), frames=240):
+    """
+    Prints the per-step cost of a salvo against flying the same rockets one world at a time.
+    """
+    print(f'{"rockets":>7} {"salvo":>12} {"one by one":>12}')
+    for count in counts:
+        vectorized, one_by_one = time_salvo(count, frames)
+        print(f'{count:>7} {vectorized * 1e6:>9.1f} us {one_by_one * 1e6:>9.1f} us')
+
+
+def gravity_lookup(counts=(1, 10, 100, 1000), repeats=2000, seed=0):
+    """
+    Prints the cost of the Sun's pull on count rockets worked out exactly and looked up in a GravityField,
+    and the largest difference between the two.
+    """
+    import numpy as np
+
+    from scripts.gravity_field import GravityField
+
+    sun = belt(1)[0]
+    sun.place()
+    field = GravityField(attractors=[(sun.centerx, sun.centery, sun.mass)], width=SCREEN_WIDTH, height=SCREEN_HEIGHT)
+    rng = np.random.default_rng(seed)
+    print(f'{"rockets":>7} {"exact":>12} {"lookup":>12} {"error":>9}')
+    for count in counts:
+        # Where rockets fly: outside the Sun, on the screen
+        angle = rng.uniform(0, math.pi * 2, count)
+        distance = rng.uniform(sun.radius, SCREEN_HEIGHT / 2, count)
+        x = sun.centerx + np.cos(angle) * distance
+        y = sun.centery + np.sin(angle) * distance
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            exact = field.exact(x, y)
+        exact_time = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            looked_up = field.sample(x, y)
+        lookup_time = (time.perf_counter() - start) / repeats
+
+        error = np.max(np.hypot(looked_up[0] - exact[0], looked_up[1] - exact[1]) / np.hypot(*exact))
+        print(f'{count:>7} {exact_time * 1e6:>9.1f} us {lookup_time * 1e6:>9.1f} us {error:>9.2%}')
+
+
+if __name__ == '__main__':
+    collision_scaling()
+    print()
+    salvo_scaling()
+    print()
+    gravity_lookup()
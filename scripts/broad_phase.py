@@ -0,0 +1,123 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Broad phase for collisions. Bodies are filed in a uniform grid by the bounding box of their circle,
+so a collision check only runs the exact rectangle and circle test against bodies in the cells the
+rocket is in, however many bodies there are. Used by find_collision_object and scripts/simulation.py.
+"""
+
+import math
+
+
+class SpatialGrid:
+    """
+    Uniform grid of square cells holding bodies by their bounding circles.
+
+    Moving bodies are filed with their circle grown by as far as they can move in period steps, and
+    only refiled every period steps, a few of them each step. So keeping the grid up to date costs
+    a fraction of a lookup per body per step, instead of one. locate(key) returns a body's center.
+
+    Queries return bodies in the order they were added, so callers that let the last hit win keep
+    doing so.
+    """
+    def __init__(self, locate, cell_size=64, period=16):
+        self.locate = locate
+        self.cell_size = cell_size
+        self.period = period
+        self.frame = 0
+        self.cells = {}  # (column, row): set of keys
+        self.spans = {}  # key: (first column, first row, last column, last row) of the cells it is in
+        self.sizes = {}  # key: (radius, slack), slack being how far past its radius it is filed
+        self.order = {}  # key: when it was added
+        self.due = {}  # frame: keys to refile then
+        self.added = 0
+
+    def __contains__(self, key):
+        return key in self.spans
+
+    def __len__(self):
+        return len(self.spans)
+
+    def add(self, key, radius, speed=0):
+        """
+        Adds a body. speed is the furthest it moves in one step, in pixels. Bodies with no speed never move.
+        """
+        # One more pixel, as centers come from rects truncated to whole pixels
+        self.sizes[key] = (radius, speed * self.period + 1 if speed else 0)
+        self.order[key] = self.added
+        self.added += 1
+        self.refile(key, self.frame + 1 + self.order[key] % self.period)
+
+    def remove(self, key):
+        self.unfile(key)
+        del self.sizes[key]
+        del self.order[key]
+        for keys in self.due.values():
+            if key in keys:
+                keys.remove(key)
+
+    def refile(self, key, due):
+        center_x, center_y = self.locate(key)
+        radius, slack = self.sizes[key]
+        reach = radius + slack
+        size = self.cell_size
+        span = (math.floor((center_x - reach) / size), math.floor((center_y - reach) / size),
+                math.floor((center_x + reach) / size), math.floor((center_y + reach) / size))
+        if span != self.spans.get(key):
+            if key in self.spans:
+                self.unfile(key)
+            self.spans[key] = span
+            first_column, first_row, last_column, last_row = span
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    self.cells.setdefault((column, row), set()).add(key)
+        if slack:
+            self.due.setdefault(due, []).append(key)
+
+    def unfile(self, key):
+        first_column, first_row, last_column, last_row = self.spans.pop(key)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self.cells[(column, row)]
+                cell.discard(key)
+                if not cell:
+                    del self.cells[(column, row)]
+
+    def step(self):
+        """
+        Refiles the bodies that are due. Runs once per physics step, after the bodies move.
+        """
+        self.frame += 1
+        for key in self.due.pop(self.frame, ()):
+            self.refile(key, self.frame + self.period)
+
+    def refile_all(self):
+        """
+        Refiles every body, for when they jump instead of stepping, like at the start of a game.
+        """
+        self.due = {}
+        for key in self.order:
+            self.refile(key, self.frame + 1 + self.order[key] % self.period)
+
+    def query(self, left, top, right, bottom):
+        """
+        Returns the bodies whose bounding boxes may touch the rectangle, in the order they were added.
+        Never leaves out one the exact test would hit.
+        """
+        size = self.cell_size
+        first_column, first_row = math.floor(left / size), math.floor(top / size)
+        last_column, last_row = math.floor(right / size), math.floor(bottom / size)
+        found = set()
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self.cells.get((column, row))
+                if cell:
+                    found.update(cell)
+        if len(found) < 2:
+            return list(found)
+        return sorted(found, key=self.order.__getitem__)
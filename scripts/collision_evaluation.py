@@ -2,7 +2,8 @@
 SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
 SPDX-License-Identifier: GPL-3.0-or-later
 
-The collision function copyright (C) 2014 user Martineau on Stack Overflow
+The swept collision test is built on the collision function in scripts/simulation.py, copyright (C) 2014 user
+Martineau on Stack Overflow
 https://stackoverflow.com/questions/24727773/detecting-rectangle-collision-with-a-circle
 
 See main.py for the full GPL-3.0 license header.
@@ -12,62 +13,52 @@ See LICENSES directory for licensing of other works included in this project.
 
 import math
 
+import pygame
+
 from scripts.planet import Planet
+from scripts.simulation import Impact, sweep, velocities_match
 from scripts.utils import make_states_false
 
 
-# Copyright (C) 2014 Martineau
-def collision(rleft, rtop, width, height,  # rectangle definition
-              center_x, center_y, radius, ):  # circle definition
-    """ Detect collision between a rectangle and circle. """
-
-    # complete boundbox of the rectangle
-    rright, rbottom = rleft + width, rtop + height
-
-    # bounding box of the circle
-    cleft, ctop = center_x - radius, center_y - radius
-    cright, cbottom = center_x + radius, center_y + radius
-
-    # trivial reject if bounding boxes do not intersect
-    if rright < cleft or rleft > cright or rbottom < ctop or rtop > cbottom:
-        return False  # no collision possible
-
-    # check whether any point of rectangle is inside circle's radius
-    for x in (rleft, rleft + width):
-        for y in (rtop, rtop + height):
-            # compare distance between circle's center point and each point of
-            # the rectangle with the circle's radius
-            if math.hypot(x - center_x, y - center_y) <= radius:
-                return True  # collision detected
-
-    # check if center of circle is inside rectangle
-    if rleft <= center_x <= rright and rtop <= center_y <= rbottom:
-        return True  # overlaid
-
-    return False  # no collision detected
-
-
 def find_collision_object(game):
     """
-    Determines if the rocket has collided with a planet or the Sun.
+    Determines if the rocket has collided with a planet or the Sun during the last physics step.
     Updates game.user_won.
     """
-    # Check collision with planets
-    for planet in game.planets.values():
-        if collision(rleft=game.rocket.rect.x, rtop=game.rocket.rect.y,
-                     width=game.rocket.rect.width, height=game.rocket.rect.height,
-                     center_x=planet.rect.centerx, center_y=planet.rect.centery,
-                     radius=planet.radius):
-            game.rocket.current_planet = planet
-            update_user_won(game)
-
-    # Check collision with Sun
-    if collision(rleft=game.rocket.rect.x, rtop=game.rocket.rect.y,
-                 width=game.rocket.rect.width, height=game.rocket.rect.height,
-                 center_x=game.sun.rect.centerx, center_y=game.sun.rect.centery,
-                 radius=game.sun.radius):
-        game.rocket.current_planet = game.sun
-        update_user_won(game)
+    rocket = game.rocket
+    rect = rocket.rect
+    prev_rect = pygame.Rect(rocket.prev_x, rocket.prev_y, rect.width, rect.height)
+    # Only bodies near where the rocket went this step get the exact test. They come in the order they were added
+    # to the grid, the planets and then the Sun, so the Sun is still checked last.
+    hit = None
+    first = None
+    for body in game.collision_grid.query(min(prev_rect.left, rect.left), min(prev_rect.top, rect.top),
+                                          max(prev_rect.right, rect.right), max(prev_rect.bottom, rect.bottom)):
+        if isinstance(body, Planet):
+            prev_center = pygame.Rect(body.prev_x, body.prev_y, body.rect.width, body.rect.height).center
+        else:
+            prev_center = body.rect.center  # The Sun doesn't move
+        fraction = sweep(prev_left=prev_rect.x, prev_top=prev_rect.y, rleft=rect.x, rtop=rect.y,
+                         width=rect.width, height=rect.height, prev_center_x=prev_center[0],
+                         prev_center_y=prev_center[1], center_x=body.rect.centerx, center_y=body.rect.centery,
+                         radius=body.radius)
+        # The first body touched during the step wins, or the last checked of those touched at the same moment
+        if fraction is not None and (first is None or fraction <= first):
+            hit, first = body, fraction
+    if hit is None:
+        return
+
+    time = game.physics_time - game.physics_dt * (1 - first)
+    rocket_velocity = (rocket.prev_raw_velocity[0] + (rocket.raw_velocity[0] - rocket.prev_raw_velocity[0]) * first,
+                       rocket.prev_raw_velocity[1] + (rocket.raw_velocity[1] - rocket.prev_raw_velocity[1]) * first)
+    if isinstance(hit, Planet):
+        body_velocity = game.ephemeris.state(hit.name, time)[2:]
+    else:
+        body_velocity = (0, 0)
+    rocket.impact = Impact(body=hit, fraction=first, time=time, rocket_velocity=rocket_velocity,
+                           body_velocity=body_velocity)
+    rocket.current_planet = hit
+    update_user_won(game)
 
 
 def update_user_won(game):  # Runs upon a collision
@@ -84,9 +75,8 @@ def update_user_won(game):  # Runs upon a collision
             # Incorrect planet
             game.assets['end_banners'][1] = game.assets['lose_banners'][1]
 
-        # Decide if rocket came in at proper velocity
-        if (math.fabs(game.rocket.raw_velocity[0] - game.rocket.current_planet.velocity[0]) <= 51 and
-                math.fabs(game.rocket.raw_velocity[1] - game.rocket.current_planet.velocity[1]) <= 51):
+        # Decide if rocket came in at proper velocity, at the moment it hit
+        if velocities_match(game.rocket.impact.rocket_velocity, game.rocket.impact.body_velocity):
             # If rocket did not crash
             game.user_won[1] = True
             game.assets['end_banners'][2] = game.assets['win_banners'][2]
@@ -117,7 +107,7 @@ def update_user_won(game):  # Runs upon a collision
         game.rocket.state['crashing'] = True
 
     game.screens['end_screen'].images = game.assets['end_banners']
-    game.state['end_screen'] = True
+    game.scenes.set('gameplay', 'end_screen', 'restart_and_pause_screen')
     # show_end_screen(game)
 
 
@@ -139,15 +129,17 @@ def show_end_screen(game):
         # Lose
         print(f'Your rocket crashed back into {game.rocket.current_planet.name.capitalize()}!')
     if isinstance(game.rocket.current_planet, Planet):
-        print(round(math.fabs(game.rocket.raw_velocity[0] - game.rocket.current_planet.velocity[0]), 2),
-              round(math.fabs(game.rocket.raw_velocity[1] - game.rocket.current_planet.velocity[1]), 2))
+        impact = game.rocket.impact
+        print(round(math.fabs(impact.rocket_velocity[0] - impact.body_velocity[0]), 2),
+              round(math.fabs(impact.rocket_velocity[1] - impact.body_velocity[1]), 2))
 
 
 # Use this if you need to print the velocity difference between the rocket and planet to the screen
 def get_velocity_diff(game):
     if isinstance(game.rocket.current_planet, Planet):
-        text = (f"X: {round(math.fabs(game.rocket.raw_velocity[0] - game.rocket.current_planet.velocity[0]), 2)}   "
-                f"Y: {round(math.fabs(game.rocket.raw_velocity[1] - game.rocket.current_planet.velocity[1]), 2)}")
+        impact = game.rocket.impact
+        text = (f"X: {round(math.fabs(impact.rocket_velocity[0] - impact.body_velocity[0]), 2)}   "
+                f"Y: {round(math.fabs(impact.rocket_velocity[1] - impact.body_velocity[1]), 2)}")
     else:
         text = "Obliterated by the Sun"
     return text
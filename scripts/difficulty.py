@@ -0,0 +1,249 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+How hard the game is, by where it starts. Runs random launches with the batch simulation
+(scripts/batch_simulation.py): planet angles drawn uniformly, and a random place on Earth's rim and
+aim, as a player might pick. By default every start counts, but initialize_gameplay draws the planets
+again, up to REDRAWS times, while the launch window table (scripts/launch_windows.py) says no launch
+wins from there. With --winnable the planets are drawn the same way, so the rates are those of the
+starts players get.
+
+Launches run in shards of a fixed size across processes, and each shard is written to the output
+directory as it finishes. Shards share nothing and come back as files, so the work spreads evenly over
+however many processes there are. A run that is stopped picks up again from the shards already
+written, and asking for more launches later only adds shards.
+
+Once the shards are done, they are counted up, with the angles measured from Earth's angle as in
+scripts/launch_windows.py, into:
+    summary.csv: launches and outcomes for every phase (Mars' angle from Earth's) and rim angle bin
+    heatmap_<outcome>_phase_rim.png and heatmap_<outcome>_phase_aim.png: how often each outcome
+    happened, brighter for more often. Phase runs left to right and the rim angle or aim top to
+    bottom, each from the bin at 0 degrees (the aim's from -180). Bins without launches are grey.
+Outcomes are won, crashed (hit a planet without winning), sun and lost (still flying at MAX_TIME).
+
+Run from the top of the repository:
+python -m scripts.difficulty [--launches 1000000] [--workers N] [--output difficulty] [--winnable]
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from scripts.launch_windows import LaunchWindows, TABLE_PATH
+
+TAU = math.pi * 2
+REDRAWS = 20  # Times initialize_gameplay draws the planets while they start where nothing wins
+VERSION = 1  # Of the shard files, with the settings they were made with in run.json
+OUTCOMES = ('won', 'crashed', 'sun', 'lost')
+COLORS = {'won': (98, 235, 0), 'crashed': (207, 35, 64), 'sun': (255, 170, 60), 'lost': (0, 198, 247)}
+EMPTY = (40, 40, 40)  # Heat map bins without launches
+
+
+def shard_path(directory, index):
+    return os.path.join(directory, f'shard_{index:05}.npz')
+
+
+def run_shard(directory, index, size, seed, winnable=False):
+    """
+    Simulates shard index of a run, writes it to directory and returns how many launches it held.
+    Shards are drawn from (seed, index), so each comes out the same whichever process runs it. With
+    winnable, planets starting where the launch window table says nothing wins are drawn again, as in
+    initialize_gameplay.
+    """
+    from scripts.batch_simulation import NO_HIT, simulate_launches
+
+    random = np.random.default_rng((seed, index))
+    earth = random.uniform(0, TAU, size)
+    mars = random.uniform(0, TAU, size)
+    if winnable:
+        windows = LaunchWindows.load()
+        winnable_phases = np.array([rim_bin is not None for rim_bin in windows.best_rims])
+        for _ in range(REDRAWS - 1):
+            phase_bin = ((mars - earth) % TAU / TAU * windows.phases).astype(np.intp) % windows.phases
+            redraw = np.nonzero(~winnable_phases[phase_bin])[0]
+            if not redraw.size:
+                break
+            earth[redraw] = random.uniform(0, TAU, redraw.size)
+            mars[redraw] = random.uniform(0, TAU, redraw.size)
+    rim = random.uniform(0, TAU, size)
+    aim = random.uniform(-math.pi, math.pi, size)
+    result = simulate_launches(earth_angles=earth, mars_angles=mars, rim_angles=rim, target_angles=aim)
+
+    outcome = np.full(size, OUTCOMES.index('crashed'), dtype=np.int8)
+    outcome[result.hit == result.bodies.index('sun')] = OUTCOMES.index('sun')
+    outcome[result.hit == NO_HIT] = OUTCOMES.index('lost')
+    outcome[result.won] = OUTCOMES.index('won')
+
+    # Written under another name first, so a shard file is only ever there whole
+    path = shard_path(directory, index)
+    with open(path + '.part', 'wb') as file:
+        np.savez(file, earth=earth.astype(np.float32), mars=mars.astype(np.float32), rim=rim.astype(np.float32),
+                 aim=aim.astype(np.float32), outcome=outcome)
+    os.replace(path + '.part', path)
+    return size
+
+
+def prepare(directory, shard_size, seed, winnable=False):
+    """
+    Makes directory for a run, or checks that the run already there was made with the same settings,
+    since shards from different settings can't be counted together.
+    """
+    os.makedirs(directory, exist_ok=True)
+    settings = {'version': VERSION, 'shard_size': shard_size, 'seed': seed, 'winnable': winnable}
+    path = os.path.join(directory, 'run.json')
+    if os.path.exists(path):
+        with open(path) as file:
+            saved = json.load(file)
+        saved.setdefault('winnable', False)  # Runs from before --winnable
+        if saved != settings:
+            raise ValueError(f'{directory} holds a run with other settings ({saved}); pick another --output')
+    else:
+        with open(path, 'w') as file:
+            json.dump(settings, file)
+
+
+def run(directory, shards, shard_size, seed, winnable=False, workers=None, progress=None):
+    """
+    Runs the shards of 0 to shards - 1 not written yet across workers processes. progress(done, total),
+    if given, is called as each shard finishes, counting the ones written before.
+    """
+    missing = [index for index in range(shards) if not os.path.exists(shard_path(directory, index))]
+    done = shards - len(missing)
+    if not missing:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_shard, directory, index, shard_size, seed, winnable) for index in missing]
+        try:
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                if progress is not None:
+                    progress(done, shards)
+        except BaseException:  # Including KeyboardInterrupt. Shards already written are kept for next time
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def aggregate(directory, shards, phases=72, rims=24, aims=72):
+    """
+    Counts the outcomes of shards 0 to shards - 1. Returns (phase x rim x outcome counts,
+    phase x aim x outcome counts).
+    """
+    phase_rim = np.zeros((phases, rims, len(OUTCOMES)), dtype=np.int64)
+    phase_aim = np.zeros((phases, aims, len(OUTCOMES)), dtype=np.int64)
+    for index in range(shards):
+        with np.load(shard_path(directory, index)) as shard:
+            earth = shard['earth'].astype(np.float64)
+            phase_bin = bins((shard['mars'] - earth) % TAU / TAU, phases)
+            rim_bin = bins((shard['rim'] - earth) % TAU / TAU, rims)
+            aim_bin = bins((shard['aim'] - earth + math.pi) % TAU / TAU, aims)
+            outcome = shard['outcome'].astype(np.intp)
+        phase_rim += np.bincount((phase_bin * rims + rim_bin) * len(OUTCOMES) + outcome,
+                                 minlength=phase_rim.size).reshape(phase_rim.shape)
+        phase_aim += np.bincount((phase_bin * aims + aim_bin) * len(OUTCOMES) + outcome,
+                                 minlength=phase_aim.size).reshape(phase_aim.shape)
+    return phase_rim, phase_aim
+
+
+def bins(fractions, count):
+    return np.minimum((fractions * count).astype(np.intp), count - 1)  # float32 rounding can reach 1
+
+
+def write_summary(path, phase_rim):
+    """
+    Writes a CSV row per phase and rim angle bin, with the bin's start in degrees.
+    """
+    phases, rims, _ = phase_rim.shape
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['phase', 'rim_angle', 'launches', *OUTCOMES, 'win_rate'])
+        for phase_bin in range(phases):
+            for rim_bin in range(rims):
+                counts = phase_rim[phase_bin, rim_bin]
+                launches = int(counts.sum())
+                writer.writerow([f'{phase_bin * 360 / phases:g}', f'{rim_bin * 360 / rims:g}', launches,
+                                 *counts.tolist(), f'{counts[0] / launches:.6f}' if launches else ''])
+
+
+def write_heat_map(path, counts, outcome, cell=8):
+    """
+    Writes an image of how often outcome happened in each bin of counts (x bins, y bins, outcomes), cell
+    pixels a bin. Brightness is scaled to the bin where it happened most often.
+    """
+    import pygame
+
+    launches = counts.sum(axis=2)
+    rate = counts[:, :, OUTCOMES.index(outcome)] / np.maximum(launches, 1)
+    level = rate / max(rate.max(), 1e-12)
+    pixels = (level[:, :, None] * np.array(COLORS[outcome])).astype(np.uint8)
+    pixels[launches == 0] = EMPTY
+    surface = pygame.surfarray.make_surface(pixels)  # Indexed [x][y], like counts
+    pygame.image.save(pygame.transform.scale(surface, (counts.shape[0] * cell, counts.shape[1] * cell)), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Win, crash and Sun rates of random launches by starting position.')
+    parser.add_argument('--launches', type=int, default=1000000, help='launches to run, rounded up to whole shards')
+    parser.add_argument('--shard-size', type=int, default=50000, help='launches per shard')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes to run shards in')
+    parser.add_argument('--seed', type=int, default=0, help='seed the launches are drawn from')
+    parser.add_argument('--winnable', action='store_true',
+                        help='draw the planets again where no launch wins, as the game does, instead of uniformly')
+    parser.add_argument('--output', default='difficulty', help='directory for the shards and the results')
+    parser.add_argument('--phases', type=int, default=72, help='phase bins')
+    parser.add_argument('--rims', type=int, default=24, help='rim angle bins')
+    parser.add_argument('--aims', type=int, default=72, help='aim bins')
+    args = parser.parse_args()
+
+    shards = math.ceil(args.launches / args.shard_size)
+    if args.winnable and LaunchWindows.load() is None:
+        sys.exit(f'--winnable needs the launch window table, {TABLE_PATH}. See scripts/launch_windows.py')
+    try:
+        prepare(args.output, args.shard_size, args.seed, args.winnable)
+    except ValueError as error:
+        sys.exit(error)
+    start = time.perf_counter()
+    first = sum(os.path.exists(shard_path(args.output, index)) for index in range(shards))
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        rate = (done - first) * args.shard_size / elapsed
+        print(f'\r{done}/{total} shards, {elapsed:.0f} s, {rate:.0f} launches/s', end='', file=sys.stderr)
+
+    try:
+        run(args.output, shards, args.shard_size, args.seed, winnable=args.winnable, workers=args.workers,
+            progress=progress)
+    except KeyboardInterrupt:
+        print('\nStopped. Run the same command again to carry on from the shards written', file=sys.stderr)
+        sys.exit(130)
+    if first < shards:
+        print(file=sys.stderr)
+
+    phase_rim, phase_aim = aggregate(args.output, shards, phases=args.phases, rims=args.rims, aims=args.aims)
+    write_summary(os.path.join(args.output, 'summary.csv'), phase_rim)
+    for outcome in ('won', 'crashed', 'sun'):
+        write_heat_map(os.path.join(args.output, f'heatmap_{outcome}_phase_rim.png'), phase_rim, outcome)
+        write_heat_map(os.path.join(args.output, f'heatmap_{outcome}_phase_aim.png'), phase_aim, outcome)
+
+    totals = phase_rim.sum(axis=(0, 1))
+    launches = int(totals.sum())
+    print(f'{launches} launches: ' + ', '.join(f'{name} {count / launches:.2%}' for name, count in
+                                               zip(OUTCOMES, totals.tolist())))
+    playable = phase_rim[:, :, 0].sum(axis=1) > 0
+    print(f'{int(playable.sum())} of {args.phases} phases were won at least once. Results are in {args.output}')
+
+
+if __name__ == '__main__':
+    main()
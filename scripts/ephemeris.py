@@ -0,0 +1,71 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Planet positions and velocities as a function of time. Planets move on fixed circles at a fixed
+rate, so where a planet is and how fast it is going at any time follows directly from its starting
+angle, without stepping through the frames in between.
+"""
+
+import math
+
+
+class Orbit:
+    """
+    A circular orbit. Angles are in radians and angular_velocity in radians per second.
+    Positions are the top left corner of a body of the given size, like Planet.x and Planet.y.
+    """
+    def __init__(self, orbit_radius, angular_velocity, angle, size, center):
+        self.orbit_radius = orbit_radius
+        self.angular_velocity = angular_velocity
+        self.angle = angle  # At time 0
+        self.offset_x = center[0] - size[0] / 2
+        self.offset_y = center[1] - size[1] / 2
+
+    def angle_at(self, t):
+        return self.angle + self.angular_velocity * t
+
+    def state(self, t):
+        """
+        Returns the position and the exact velocity (pixels per second) t seconds in, as (x, y, vx, vy).
+        """
+        angle = self.angle_at(t)
+        cos = math.cos(angle)
+        sin = math.sin(angle)
+        speed = self.orbit_radius * self.angular_velocity
+        return (cos * self.orbit_radius + self.offset_x, sin * self.orbit_radius + self.offset_y,
+                -sin * speed, cos * speed)
+
+
+class Ephemeris:
+    """
+    States of named orbits at any time. Times on the physics step grid (multiples of dt) up to
+    frames steps in are tabulated as they are first asked for, so every world or game stepping
+    through the same frames after the first one gets a lookup. Other times are computed directly.
+    """
+    def __init__(self, orbits, dt, frames):
+        self.orbits = orbits
+        self.dt = dt
+        self.frames = frames
+        self.tables = {name: [] for name in orbits}
+
+    def state(self, name, t):
+        """
+        Returns (x, y, vx, vy) of the named orbit t seconds in.
+        """
+        frame = round(t / self.dt)
+        # Physics time is a running sum of dt, so allow for rounding when matching it to a step
+        if 0 <= frame <= self.frames and math.fabs(t - frame * self.dt) <= self.dt * 1e-6:
+            table = self.tables[name]
+            if frame >= len(table):
+                orbit = self.orbits[name]
+                table.extend(orbit.state(n * self.dt) for n in range(len(table), frame + 1))
+            return table[frame]
+        return self.orbits[name].state(t)
+
+    def angle_at(self, name, t):
+        return self.orbits[name].angle_at(t)
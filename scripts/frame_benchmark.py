@@ -0,0 +1,318 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Frame time benchmarks for the game loop, run without a window. Times startup, drawing, the updates
+that run each physics step and a scripted flight through the whole loop, and writes the results to
+a JSON file. Given a baseline (an earlier results file), reports anything that got slower by more
+than the threshold and exits with status 1, so a regression can fail a build.
+
+Run from the top of the repository:
+python -m scripts.frame_benchmark [--output FILE] [--baseline FILE] [--threshold 0.15]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame
+
+from scripts.collision_evaluation import find_collision_object
+from scripts.replay import HEADER, FRAME, MOUSE, EVENT, MAGIC, VERSION, MOUSE_MOVED, EVENT_CODES, Playback
+from scripts.utils import make_states_false
+
+SEED = 2024  # Planet positions every benchmark starts from
+
+
+def summarize(samples):
+    """
+    Returns statistics of samples (seconds) in microseconds.
+    """
+    ordered = sorted(samples)
+    return {'runs': len(ordered),
+            'median': statistics.median(ordered) * 1e6,
+            'mean': statistics.fmean(ordered) * 1e6,
+            'stdev': (statistics.stdev(ordered) if len(ordered) > 1 else 0) * 1e6,
+            'min': ordered[0] * 1e6,
+            'p95': ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)] * 1e6}
+
+
+def measure(function, runs, warmup=None, setup=None):
+    """
+    Calls function warmup times untimed, then times it runs times. setup runs before every call,
+    outside the timing. Returns the statistics of the timed calls.
+    """
+    samples = []
+    for run in range(runs + (runs // 10 if warmup is None else warmup)):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples[-runs:])
+
+
+def new_game():
+    from main import Game
+
+    return Game(seed=SEED)
+
+
+def time_async_startup(runs):
+    """
+    Returns the statistics of how long Game.load() takes to get to the start menu, with the assets only
+    needed later still loading.
+    """
+    from main import Game
+
+    samples = []
+
+    async def load():
+        start = time.perf_counter()
+        game = Game(seed=SEED, preload=False)
+        await game.load()
+        samples.append(time.perf_counter() - start)
+        await game.lazy_loader
+
+    for _ in range(runs):
+        asyncio.run(load())
+    return summarize(samples)
+
+
+def start_flight(game):
+    """
+    Puts the rocket back on Earth, at the start of a level, and launches it towards the top left, on a
+    flight that lasts several seconds. The planets and the rocket start in the same place every time,
+    whatever ran before.
+    """
+    game.random.seed(SEED)
+    game.initialize_gameplay()
+    rocket = game.rocket
+    rocket.angle = math.pi * 1.5  # Top of Earth
+    rocket.movement = [False, False]
+    rocket.update()  # Moves the rocket's rect onto the rim, which the launch aims from
+    game.mouse_pos = (300, 0)
+    make_states_false(rocket)
+    rocket.state['setting_trajectory'] = True
+
+
+def fly(game, steps):
+    """
+    Runs physics steps until the rocket left Earth, at most steps of them. Raises RuntimeError unless
+    the rocket is then still flying, clear of Earth.
+    """
+    for _ in range(steps):
+        game.update_gameplay()
+        if game.rocket.state['left_base_planet']:
+            break
+    if not (game.rocket.state['flying'] and game.rocket.state['left_base_planet']):
+        state = ', '.join(name for name, value in game.rocket.state.items() if value)
+        raise RuntimeError(f'the benchmark flight is not in flight after {steps} steps ({state})')
+
+
+def scripted_session(path, seed=SEED):
+    """
+    Writes a recording (see scripts/replay.py) that starts a game from the menu, turns the rocket on
+    Earth, launches it and flies until it hits something or ten seconds pass.
+    """
+    frames = []
+
+    def frame(mouse_pos=None, events=()):
+        frames.append((1 / 120, mouse_pos, events))
+
+    frame((10, 10))
+    frame((400, 410), [(pygame.MOUSEBUTTONUP, 1)])  # Start
+    frame((600, 200), [(pygame.KEYDOWN, pygame.K_RIGHT)])
+    for _ in range(30):
+        frame()
+    frame(None, [(pygame.KEYUP, pygame.K_RIGHT)])
+    for i in range(60):
+        frame((600 + i, 200 - i))  # Aiming, with the trajectory preview running
+    frame(None, [(pygame.MOUSEBUTTONUP, 1)])  # Launch
+    for _ in range(1200):
+        frame()
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, seed))
+        for dt, mouse_pos, events in frames:
+            file.write(FRAME.pack(dt, MOUSE_MOVED if mouse_pos else 0, len(events)))
+            if mouse_pos:
+                file.write(MOUSE.pack(*mouse_pos))
+            for event_type, value in events:
+                file.write(EVENT.pack(EVENT_CODES[event_type], value))
+    return len(frames)
+
+
+def time_session(path, frames):
+    """
+    Plays the recording at path through the game loop as fast as it runs. Returns seconds per frame.
+    """
+    import main
+
+    playback = Playback(path, realtime=False)
+    main.game = main.Game(seed=playback.seed)
+    main.game.input = playback
+    main.game.input.close = lambda: None  # Keeps quiet when the session ends
+    start = time.perf_counter()
+    try:
+        asyncio.run(main.main())
+    except SystemExit:
+        pass
+    return (time.perf_counter() - start) / frames
+
+
+def run(scale=1):
+    """
+    Runs every benchmark, each scale times as many runs as usual. Returns {name: statistics}.
+    """
+    results = {}
+
+    def runs(count):
+        return max(3, round(count * scale))
+
+    results['startup'] = measure(new_game, runs(5), warmup=1)
+    results['startup.async'] = time_async_startup(runs(5))
+    game = new_game()
+
+    def idle_frame():
+        for scene in game.renderer.begin():
+            game.renderer.add(scene.render())
+        game.renderer.end()
+
+    # Whole frames of a menu with the mouse still
+    game.mouse_pos = (700, 150)
+    results['frame.start_menu_screen'] = measure(idle_frame, runs(2000))
+    game.initialize_gameplay()
+    game.pause()
+    results['frame.pause_screen'] = measure(idle_frame, runs(2000))
+    game.resume()
+
+    game.initialize_gameplay()
+    for name, screen in game.screens.items():
+        if screen is not None:
+            results[f'screen.{name}'] = measure(screen.render, runs(500))
+
+    game.alpha = 0.5
+    results['render_gameplay.positioning'] = measure(game.render_gameplay, runs(500), setup=game.renderer.dirty.clear)
+    game.planets['earth'].update()
+    results['planet.update'] = measure(game.planets['earth'].update, runs(2000))
+
+    def turning():
+        make_states_false(game.rocket)
+        game.rocket.state['positioning'] = True
+        game.rocket.movement = [True, False]
+
+    results['rocket.update.positioning'] = measure(game.rocket.update, runs(2000), setup=turning)
+    results['rocket.update.setting_trajectory'] = measure(game.rocket.update, runs(500),
+                                                          setup=lambda: start_flight(game))
+
+    start_flight(game)
+    fly(game, 120)
+    flight = (game.rocket.x, game.rocket.y, list(game.rocket.velocity), dict(game.rocket.state))
+
+    def flying():
+        game.rocket.x, game.rocket.y = flight[0], flight[1]
+        game.rocket.velocity = list(flight[2])
+        game.rocket.state = dict(flight[3])
+        game.rocket.rect.topleft = (game.rocket.x, game.rocket.y)
+
+    results['rocket.update.flying'] = measure(game.rocket.update, runs(2000), setup=flying)
+    results['find_collision_object'] = measure(lambda: find_collision_object(game), runs(2000), setup=flying)
+    # Benchmarks added above the flight change how the game got here. Make sure these timed a rocket in flight
+    if not game.rocket.state['flying']:
+        raise RuntimeError('rocket.update.flying and find_collision_object timed a rocket that was not flying')
+
+    def plan():
+        # A whole autopilot plan, which the game spreads over the physics steps up to its burn
+        game.autopilot.plan = None
+        game.autopilot.step()
+        if game.autopilot.plan is None:
+            state = ', '.join(name for name, value in game.rocket.state.items() if value)
+            raise RuntimeError(f'the autopilot did not start a plan, with the rocket {state}')
+        while not game.autopilot.plan.done:
+            game.autopilot.plan.advance(game.autopilot.slice_steps)
+        if len(game.autopilot.plan.salvo) == 1:
+            raise RuntimeError('the autopilot plan ended before trying any burns: the flight hits something first')
+
+    game.autopilot.enabled = True
+    results['autopilot.plan'] = measure(plan, runs(20), setup=flying)
+    game.autopilot.toggle()
+    flying()
+    results['render_gameplay.flying'] = measure(game.render_gameplay, runs(500), setup=game.renderer.dirty.clear)
+    results['telemetry.render'] = measure(game.telemetry.render, runs(2000))
+    if game.launch_windows is not None:
+        results['launch_windows.best_aim'] = measure(lambda: game.launch_windows.best_aim(1.0, 2.5, 4.0), runs(2000))
+
+    for state in ('landing', 'crashing'):
+        def resting():
+            make_states_false(game.rocket)
+            game.rocket.state[state] = True
+
+        results[f'rocket.update.{state}'] = measure(game.rocket.update, runs(2000), setup=resting)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.rec')
+        frames = scripted_session(path)
+        results['session.frame'] = summarize([time_session(path, frames) for _ in range(runs(3))])
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints each result against the baseline. Returns the names whose median grew by more than threshold
+    (0.15 is 15%).
+    """
+    regressions = []
+    print(f'{"benchmark":<36} {"median":>11} {"p95":>11} {"baseline":>11} {"change":>8}')
+    for name, stats in results.items():
+        line = f'{name:<36} {stats["median"]:>8.1f} us {stats["p95"]:>8.1f} us'
+        if name in baseline:
+            before = baseline[name]['median']
+            change = stats['median'] / before - 1 if before else 0
+            line += f' {before:>8.1f} us {change:>+8.1%}'
+            if change > threshold:
+                regressions.append(name)
+                line += '  slower'
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Frame time benchmarks for the game loop.')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='fraction a median may grow over the baseline before it counts as a regression')
+    parser.add_argument('--scale', type=float, default=1, help='multiplies the number of runs of each benchmark')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # No window
+    results = run(scale=args.scale)
+    with open(args.output, 'w') as file:
+        json.dump({'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform(),
+                   'results': results}, file, indent=1)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} slower than the baseline by more than {args.threshold:.0%}: '
+              f'{", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
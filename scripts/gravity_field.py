@@ -0,0 +1,110 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Gravity fields of attractors that never move, like the Sun, sampled once on a grid over the play area.
+The grid can be looked up instead of working the pull out again, and drawn as a heat map.
+"""
+
+import numpy as np
+import pygame
+
+from scripts.salvo import gravity_field
+from scripts.simulation import G, SCALE
+
+
+class GravityField:
+    """
+    Acceleration (pixels per frame, per frame, like scripts.simulation.gravity) of static attractors,
+    given as (center x, center y, mass), at every spacing pixels from (0, 0) to (width, height).
+
+    sample() interpolates between the four nearest grid points. The pull changes too fast close to an
+    attractor for that (the error grows with the inverse square of the distance), so points within
+    exact_radius of one, and points off the grid, get the exact pull instead.
+    """
+    def __init__(self, attractors, width, height, spacing=4, exact_radius=64):
+        self.spacing = spacing
+        self.center_x = np.array([center_x for center_x, _, _ in attractors], dtype=np.float64)
+        self.center_y = np.array([center_y for _, center_y, _ in attractors], dtype=np.float64)
+        self.gm = np.array([G * mass / SCALE ** 2 for _, _, mass in attractors])
+        self.exact_radius = exact_radius
+
+        self.columns = int(np.ceil(width / spacing)) + 1
+        self.rows = int(np.ceil(height / spacing)) + 1
+        grid_y, grid_x = np.mgrid[0:self.rows, 0:self.columns] * float(spacing)
+        ax, ay = self.exact(grid_x.ravel(), grid_y.ravel())
+        self.ax = ax.reshape(self.rows, self.columns)
+        self.ay = ay.reshape(self.rows, self.columns)
+        # Corners of each cell, flattened, as (ax, ay) pairs: top left, top right, bottom left, bottom right
+        table = np.stack((self.ax, self.ay), axis=-1)
+        self.corners = np.concatenate((table[:-1, :-1], table[:-1, 1:], table[1:, :-1], table[1:, 1:]),
+                                      axis=-1).reshape(-1, 8)
+        # Cells that come within exact_radius of an attractor are worked out exactly
+        reach = exact_radius + spacing * 1.5  # From the cell's middle to past its corners
+        middle_y, middle_x = grid_y[:-1, :-1] + spacing / 2, grid_x[:-1, :-1] + spacing / 2
+        self.interpolated = np.ones((self.rows - 1) * (self.columns - 1), dtype=bool)
+        for center_x, center_y in zip(self.center_x, self.center_y):
+            self.interpolated &= ((middle_x - center_x) ** 2 + (middle_y - center_y) ** 2 >= reach ** 2).ravel()
+
+    def exact(self, x, y):
+        return gravity_field(x, y, self.center_x, self.center_y, self.gm)
+
+    def sample(self, x, y):
+        """
+        Returns the accelerations (ax, ay) at points x, y, arrays of pixels.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        column = x / self.spacing
+        row = y / self.spacing
+        left = np.floor(column)
+        top = np.floor(row)
+        cell = top.astype(np.intp) * (self.columns - 1) + left.astype(np.intp)
+        inside = (left >= 0) & (left < self.columns - 1) & (top >= 0) & (top < self.rows - 1)
+        lookup = inside & self.interpolated[np.where(inside, cell, 0)]
+
+        everywhere = lookup.all()
+        if everywhere:
+            corners = self.corners[cell]
+            across = (column - left)[:, None]
+            down = (row - top)[:, None]
+        else:
+            corners = self.corners[cell[lookup]]
+            across = (column - left)[lookup, None]
+            down = (row - top)[lookup, None]
+        upper = corners[:, 0:2] + (corners[:, 2:4] - corners[:, 0:2]) * across
+        lower = corners[:, 4:6] + (corners[:, 6:8] - corners[:, 4:6]) * across
+        pulls = upper + (lower - upper) * down
+        if everywhere:
+            return pulls[:, 0], pulls[:, 1]
+
+        ax = np.empty_like(x)
+        ay = np.empty_like(y)
+        ax[lookup], ay[lookup] = pulls[:, 0], pulls[:, 1]
+        ax[~lookup], ay[~lookup] = self.exact(x[~lookup], y[~lookup])
+        return ax, ay
+
+    def heat_map(self, size, color=(255, 170, 60), max_alpha=60):
+        """
+        Returns a transparent Surface of size showing how strong the pull is, faint where it is weak,
+        on a log scale so the whole play area shows and not just the ring around each attractor.
+        """
+        strength = np.log10(np.hypot(self.ax, self.ay) + 1e-12)
+        low, high = np.percentile(strength, (5, 99))
+        level = np.clip((strength - low) / max(high - low, 1e-12), 0, 1)
+
+        cells = pygame.Surface((self.columns, self.rows), pygame.SRCALPHA)
+        cells.fill(color)
+        alpha = pygame.surfarray.pixels_alpha(cells)
+        alpha[:] = (level.T * max_alpha).astype(np.uint8)
+        del alpha  # Unlocks the surface
+        # Scaling up smoothly blends between grid points, like sample() does. Each grid point becomes a
+        # spacing-wide square centered on it
+        scaled = pygame.transform.smoothscale(cells, (self.columns * self.spacing, self.rows * self.spacing))
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.blit(source=scaled, dest=(-self.spacing // 2, -self.spacing // 2))
+        return surface
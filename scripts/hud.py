@@ -0,0 +1,71 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Telemetry readout drawn over the gameplay (F2 in game): the rocket's speed, its speed relative to the
+target planet, how far it is from the target and the time since the level started. Once the rocket
+hits something, the last line shows the difference in velocity it hit with.
+"""
+
+import math
+
+import pygame
+
+from scripts.collision_evaluation import get_velocity_diff
+from scripts.simulation import LANDING_TOLERANCE
+from scripts.text import GlyphAtlas, text_cache, GREEN, RED
+
+FONT_SIZE = 22
+LINE_HEIGHT = 20
+LABEL_WIDTH = 90
+DEST = (10, 600)  # Top left of the first line
+
+
+LABELS = ('SPEED', 'RELATIVE', 'DISTANCE', 'TIME')
+
+
+class Telemetry:
+    """
+    The labels are rendered once, onto one surface, and the numbers are drawn from glyph atlases in a
+    single Surface.blits() call, so a frame of the readout is two blit calls and no font rasterizing.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.digits = GlyphAtlas(size=FONT_SIZE, color=GREEN)
+        self.warning = GlyphAtlas(size=FONT_SIZE, color=RED)  # For relative speeds too fast to land
+        self.labels = pygame.Surface((LABEL_WIDTH, LINE_HEIGHT * len(LABELS)), pygame.SRCALPHA)
+        for line, name in enumerate(LABELS):
+            self.labels.blit(source=text_cache.render(name, size=FONT_SIZE, color=GREEN), dest=(0, line * LINE_HEIGHT))
+
+    def render(self, surface=None):
+        """
+        Draws the readout. Returns the rects drawn on.
+        """
+        if surface is None:
+            surface = self.game.screen
+        rocket = self.game.rocket
+        target = rocket.target_planet
+        relative = (rocket.raw_velocity[0] - target.velocity[0], rocket.raw_velocity[1] - target.velocity[1])
+        distance = math.hypot(rocket.rect.centerx - target.rect.centerx,
+                              rocket.rect.centery - target.rect.centery) - target.radius
+        too_fast = max(math.fabs(relative[0]), math.fabs(relative[1])) > LANDING_TOLERANCE
+        readings = ((self.digits, f'{math.hypot(*rocket.raw_velocity):.1f}'),
+                    (self.warning if too_fast else self.digits, f'{math.hypot(*relative):.1f}'),
+                    (self.digits, f'{max(distance, 0):.0f}'),
+                    (self.digits, f'{self.game.physics_time:.2f}'))
+
+        rects = [surface.blit(source=self.labels, dest=DEST)]
+        blits = []
+        for line, (atlas, value) in enumerate(readings):
+            rects.append(atlas.layout(value, (DEST[0] + LABEL_WIDTH, DEST[1] + line * LINE_HEIGHT), blits))
+        surface.blits(blits, doreturn=False)
+        if rocket.impact is not None:
+            # Changes once per level, so the text cache keeps it
+            rects.append(surface.blit(source=text_cache.render(get_velocity_diff(self.game), size=FONT_SIZE,
+                                                               color=GREEN),
+                                      dest=(DEST[0], DEST[1] + len(LABELS) * LINE_HEIGHT)))
+        return rects
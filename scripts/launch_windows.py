@@ -0,0 +1,210 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Launch windows. Whether a launch wins depends on the angle from Earth to Mars (the phase), the rocket's
+angle on Earth's rim and the aim, each measured from Earth's angle, and on little else: the Sun is in the
+middle, so turning the whole level turns every path with it. Only rounding to whole pixels and the
+rocket's sprites, which are picked by the absolute angles, break the symmetry.
+
+Run python -m scripts.launch_windows to sweep phase x rim angle x aim with the batch simulation
+(scripts/batch_simulation.py) and write data/launch_windows.bin. Each sweep is repeated at a few random
+Earth angles, so the aims kept are the ones that win however the level is turned. LaunchWindows reads
+the file back and answers in constant time.
+
+The file is a header (magic, version, phases, rims, aims, samples) followed by a cell for every phase and
+rim angle, phase major: the aim most likely to win, as an aim bin or NO_AIM, how many aim bins wide the
+run of winning aims around it is and at how many of the sampled Earth angles it won.
+"""
+
+import argparse
+import math
+import struct
+import sys
+import time
+
+MAGIC = b'PHLW'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHB')  # Magic, version, phases, rims, aims, samples
+CELL = struct.Struct('<HBB')  # Aim bin, width of the winning run in aim bins, samples won
+NO_AIM = 0xFFFF
+
+TABLE_PATH = 'data/launch_windows.bin'
+TAU = math.pi * 2
+
+
+def wrap(angle):
+    """
+    Returns angle in [-pi, pi), the range of aims.
+    """
+    return (angle + math.pi) % TAU - math.pi
+
+
+def pick(wins, smooth=2):
+    """
+    Returns the cell for one phase and rim angle from how many samples each aim bin won: the winning bin
+    with the most wins around it (smooth bins either side), the length of the run of winning bins it is in
+    and its own wins.
+    """
+    count = len(wins)
+    best = None
+    best_score = 0
+    for aim in range(count):
+        if wins[aim]:
+            score = sum(wins[(aim + offset) % count] for offset in range(-smooth, smooth + 1))
+            if score > best_score:
+                best, best_score = aim, score
+    if best is None:
+        return NO_AIM, 0, 0
+
+    width = 1
+    for step in (1, -1):
+        aim = (best + step) % count
+        while wins[aim] and width < count:
+            width += 1
+            aim = (aim + step) % count
+    return best, min(width, 255), wins[best]
+
+
+def generate(phases=72, rims=24, aims=360, samples=4, seed=0, progress=None):
+    """
+    Sweeps every phase, rim angle and aim bin, at their middles, at samples random Earth angles. Returns
+    the table as bytes. progress(done, total), if given, is called after each phase.
+    """
+    import numpy as np
+
+    from scripts.batch_simulation import simulate_launches
+
+    random = np.random.default_rng(seed)
+    rim = (np.arange(rims) + 0.5) * (TAU / rims)
+    aim = (np.arange(aims) + 0.5) * (TAU / aims) - math.pi
+    cells = []
+    for phase_bin in range(phases):
+        phase = (phase_bin + 0.5) * (TAU / phases)
+        earth = random.uniform(0, TAU, samples)[:, None, None]
+        result = simulate_launches(earth_angles=earth, mars_angles=(earth + phase) % TAU,
+                                   rim_angles=(earth + rim[None, :, None]) % TAU,
+                                   target_angles=(earth + aim[None, None, :] + math.pi) % TAU - math.pi)
+        wins = result.won.reshape(samples, rims, aims).sum(axis=0)
+        cells.extend(pick(wins[rim_bin].tolist()) for rim_bin in range(rims))
+        if progress is not None:
+            progress(phase_bin + 1, phases)
+    return HEADER.pack(MAGIC, VERSION, phases, rims, aims, samples) + b''.join(CELL.pack(*cell) for cell in cells)
+
+
+class LaunchWindows:
+    """
+    A launch window table, read from bytes made by generate(). Angles are in radians, as the game and
+    scripts/simulation.py use them: planet angles on their orbits, Rocket.angle and Rocket.target_angle.
+    """
+    def __init__(self, data):
+        magic, version, self.phases, self.rims, self.aims, self.samples = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'not a version {VERSION} launch window table')
+        self.cells = list(CELL.iter_unpack(data[HEADER.size:]))
+        if len(self.cells) != self.phases * self.rims:
+            raise ValueError('launch window table is cut short')
+        # The best rim angle of each phase: the one whose best aim won most often, then in the widest run
+        self.best_rims = []
+        for phase_bin in range(self.phases):
+            row = self.cells[phase_bin * self.rims:(phase_bin + 1) * self.rims]
+            rim_bin = max(range(self.rims), key=lambda i: (row[i][2], row[i][1]))
+            self.best_rims.append(rim_bin if row[rim_bin][0] != NO_AIM else None)
+
+    @classmethod
+    def load(cls, path=TABLE_PATH):
+        """
+        Returns the table at path, or None if there is none.
+        """
+        try:
+            with open(path, 'rb') as file:
+                return cls(file.read())
+        except OSError:
+            return None
+
+    def phase_bin(self, earth_angle, mars_angle):
+        return int((mars_angle - earth_angle) % TAU / TAU * self.phases) % self.phases
+
+    def aim(self, earth_angle, aim_bin):
+        return wrap(earth_angle + (aim_bin + 0.5) * (TAU / self.aims) - math.pi)
+
+    def best_aim(self, earth_angle, mars_angle, rim_angle):
+        """
+        Returns the aim most likely to win from rim_angle with the planets at these angles, or None if no
+        aim won there.
+        """
+        rim_bin = int((rim_angle - earth_angle) % TAU / TAU * self.rims) % self.rims
+        aim_bin = self.cells[self.phase_bin(earth_angle, mars_angle) * self.rims + rim_bin][0]
+        return None if aim_bin == NO_AIM else self.aim(earth_angle, aim_bin)
+
+    def best_launch(self, earth_angle, mars_angle):
+        """
+        Returns the (rim angle, aim) most likely to win with the planets at these angles, or None if no
+        launch won in this phase.
+        """
+        phase_bin = self.phase_bin(earth_angle, mars_angle)
+        rim_bin = self.best_rims[phase_bin]
+        if rim_bin is None:
+            return None
+        rim_angle = (earth_angle + (rim_bin + 0.5) * (TAU / self.rims)) % TAU
+        return rim_angle, self.aim(earth_angle, self.cells[phase_bin * self.rims + rim_bin][0])
+
+    def winnable(self, earth_angle, mars_angle):
+        return self.best_rims[self.phase_bin(earth_angle, mars_angle)] is not None
+
+
+def check(windows, count, seed=0):
+    """
+    Launches from count random winnable starts with the best launch the table gives, simulating each
+    exactly with scripts.simulation.simulate_launch. Returns the fraction that won.
+    """
+    import random
+
+    from scripts.simulation import simulate_launch
+
+    rng = random.Random(seed)
+    won = tried = 0
+    while tried < count:
+        earth_angle, mars_angle = rng.uniform(0, TAU), rng.uniform(0, TAU)
+        launch = windows.best_launch(earth_angle, mars_angle)
+        if launch is None:
+            continue
+        tried += 1
+        won += simulate_launch(earth_angle, mars_angle, *launch).won
+    return won / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Builds the launch window table.')
+    parser.add_argument('--output', default=TABLE_PATH, help='where to write the table')
+    parser.add_argument('--phases', type=int, default=72, help='phase bins')
+    parser.add_argument('--rims', type=int, default=24, help='rim angle bins')
+    parser.add_argument('--aims', type=int, default=360, help='aim bins')
+    parser.add_argument('--samples', type=int, default=4, help='random Earth angles each bin is tried at')
+    parser.add_argument('--check', type=int, default=200, metavar='N',
+                        help='then try the table on N random starts with the exact simulation')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        print(f'\r{done}/{total} phases, {time.perf_counter() - start:.0f} s', end='', file=sys.stderr)
+
+    data = generate(phases=args.phases, rims=args.rims, aims=args.aims, samples=args.samples, progress=progress)
+    print(file=sys.stderr)
+    with open(args.output, 'wb') as file:
+        file.write(data)
+
+    windows = LaunchWindows(data)
+    winnable = sum(rim_bin is not None for rim_bin in windows.best_rims)
+    print(f'Wrote {args.output} ({len(data)} bytes): {winnable} of {windows.phases} phases can be won')
+    if args.check:
+        print(f'Best launches won {check(windows, args.check):.0%} of {args.check} random starts')
+
+
+if __name__ == '__main__':
+    main()
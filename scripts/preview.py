@@ -0,0 +1,144 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Predicted flight path shown while the player aims. Paths are simulated with scripts/simulation.py
+on a worker thread, or a slice per frame where threads are not available (pygbag), so the frame
+loop never waits for one.
+"""
+
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pygame
+
+from scripts.simulation import Trace, world_from_game, rim_sprite
+from scripts.text import RED, GREEN
+
+PATH_COLOR = (150, 150, 150)
+
+
+class TrajectoryPreview:
+    """
+    Shows the last completed prediction for the player's aim. Predictions are cached by aim angle,
+    rounded to aim_step radians, and planet phase, rounded to phase_step seconds of gameplay, and a
+    new one is only asked for when one of those (or the rocket's spot on the rim) changes. One
+    prediction runs at a time; when it is done, the latest one asked for in the meantime starts.
+    """
+    def __init__(self, game, aim_step=math.pi / 180, phase_step=1 / 20, cache_size=64, slice_frames=20,
+                 threaded=None):
+        self.game = game
+        self.aim_step = aim_step
+        self.phase_step = phase_step
+        self.cache_size = cache_size
+        self.slice_frames = slice_frames  # Frames simulated per slice, and per frame when not threaded
+        if threaded is None:
+            threaded = sys.platform != 'emscripten'
+        self.threaded = threaded
+        self.cache = OrderedDict()
+        self.key = None  # Key of the prediction wanted now
+        self.trace = None  # Last completed Trace
+        self.pending = None  # (key, Trace) waiting for the running one to finish
+        self.running = None  # (key, Trace) being computed
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        if self.threaded:
+            threading.Thread(target=self.work, name='trajectory-preview', daemon=True).start()
+
+    def reset(self):
+        """
+        Forgets every prediction. The planets start somewhere else on each new game.
+        """
+        with self.lock:
+            self.cache.clear()
+            self.key = None
+            self.trace = None
+            self.pending = None
+            self.running = None
+
+    def make_key(self):
+        rocket = self.game.rocket
+        aim = math.atan2(self.game.mouse_pos[1] - rocket.rect.centery, self.game.mouse_pos[0] - rocket.rect.centerx)
+        return (round(aim / self.aim_step), round(self.game.physics_time / self.phase_step),
+                rim_sprite(rocket.angle)[0], self.game.integrator)
+
+    def update(self):
+        """
+        Asks for a prediction of the current aim if it changed. Runs once per frame while positioning
+        and never blocks.
+        """
+        key = self.make_key()
+        if key != self.key:
+            self.key = key
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.trace = self.cache[key]
+                job = None
+            else:
+                # Aim at the middle of the rounded angle, kept in [-pi, pi] for the fly sprites
+                target_angle = math.remainder(key[0] * self.aim_step, math.pi * 2)
+                job = (key, Trace(world_from_game(self.game), target_angle, dt=self.game.physics_dt,
+                                  integrator=self.game.integrator))
+            with self.lock:
+                self.pending = job
+            if job is not None:
+                self.wake.set()
+
+        if not self.threaded:
+            job = self.next_job()
+            if job is not None and job[1].advance(self.slice_frames):
+                self.finish(job)
+
+    def next_job(self):
+        """
+        Returns the running prediction, starting the latest one asked for if none is running.
+        """
+        with self.lock:
+            if self.running is None:
+                self.running, self.pending = self.pending, None
+            return self.running
+
+    def work(self):
+        """
+        Worker thread. Runs predictions a slice at a time until there are none left.
+        """
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            job = self.next_job()
+            while job is not None:
+                if job[1].advance(self.slice_frames):
+                    self.finish(job)
+                time.sleep(0)  # Let the frame loop have the GIL between slices
+                job = self.next_job()
+
+    def finish(self, job):
+        key, trace = job
+        with self.lock:
+            if self.running is not job:
+                return  # The game restarted while it ran
+            self.running = None
+            self.cache[key] = trace
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.trace = trace
+
+    def render(self):
+        """
+        Draws the last completed prediction and returns the rects drawn on.
+        """
+        trace = self.trace
+        if trace is None or len(trace.points) < 2:
+            return []
+        rects = [pygame.draw.aalines(surface=self.game.screen, color=PATH_COLOR, closed=False, points=trace.points)]
+        if trace.outcome.body is not None:
+            rects.append(pygame.draw.circle(surface=self.game.screen, color=GREEN if trace.outcome.won else RED,
+                                            center=trace.points[-1], radius=4, width=1))
+        return rects
@@ -0,0 +1,150 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Frame profiler. The game loop marks the end of each phase of a frame, and the time since the last
+mark goes to that phase. The last frames are kept in ring buffers, drawn as an overlay (F3 in game)
+and exported as a Chrome trace (F4), which chrome://tracing and ui.perfetto.dev open.
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+# Phases of a frame, in the order they run. Physics and collision alternate once per physics step.
+PHASES = ('events', 'physics', 'collision', 'render', 'screens', 'profiler', 'display', 'wait')
+
+GRAPH_WIDTH = 240
+GRAPH_HEIGHT = 60
+GRAPH_SCALE = 1 / 30  # Seconds at the top of the graph
+ROW_HEIGHT = 14
+TEXT_COLOR = (230, 230, 230)
+GRAPH_COLOR = (98, 235, 0)
+SLOW_COLOR = (207, 35, 64)
+PANEL_COLOR = (0, 0, 0, 170)
+
+
+class Profiler:
+    """
+    Times the phases of each frame while enabled. Disabled, begin(), mark() and end() return at once.
+
+    times keeps each phase's total per frame for the last frames frames, and events the (phase, start,
+    end) of every mark in about as many frames, for the trace. toggle() takes effect from the next frame,
+    so a frame is never half recorded.
+    """
+    def __init__(self, frames=600, target_fps=120):
+        self.enabled = False
+        self.wanted = False  # enabled from the next frame on
+        self.frames = frames
+        self.budget = 1 / target_fps
+        self.times = {phase: [0.0] * frames for phase in PHASES}
+        self.frame_times = [0.0] * frames
+        self.count = 0  # Frames recorded
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.events = deque(maxlen=frames * 24)
+        self.frame_start = self.last = 0
+        self.font = None
+        self.graph = None
+        self.panel = None
+
+    def toggle(self):
+        self.wanted = not self.wanted
+
+    def begin(self):
+        """
+        Starts a frame.
+        """
+        self.enabled = self.wanted
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Ends a phase: the time since the last mark goes to phase.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.events.append((phase, self.last, now))
+        self.last = now
+
+    def end(self):
+        """
+        Ends a frame, keeping its times.
+        """
+        if not self.enabled:
+            return
+        slot = self.count % self.frames
+        for phase in PHASES:
+            self.times[phase][slot] = self.current[phase]
+            self.current[phase] = 0.0
+        self.frame_times[slot] = self.last - self.frame_start
+        self.count += 1
+
+    def percentiles(self, samples, points=(50, 95, 99)):
+        """
+        Returns the points percentiles of the recorded part of a ring buffer.
+        """
+        ordered = sorted(samples[:min(self.count, self.frames)])
+        if not ordered:
+            return [0.0] * len(points)
+        return [ordered[min(len(ordered) - 1, len(ordered) * point // 100)] for point in points]
+
+    def render(self, surface):
+        """
+        Draws the frame time graph and each phase's p50, p95 and p99 in the top left corner. Returns the rect drawn on.
+        """
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+            self.graph = pygame.Surface((GRAPH_WIDTH, GRAPH_HEIGHT), pygame.SRCALPHA)
+        if self.count:
+            # Scrolls the graph left by a pixel and draws the last frame at the right
+            self.graph.scroll(-1, 0)
+            frame_time = self.frame_times[(self.count - 1) % self.frames]
+            height = min(GRAPH_HEIGHT, round(frame_time / GRAPH_SCALE * GRAPH_HEIGHT))
+            self.graph.fill((0, 0, 0, 0), (GRAPH_WIDTH - 1, 0, 1, GRAPH_HEIGHT))
+            self.graph.fill(SLOW_COLOR if frame_time > self.budget * 1.5 else GRAPH_COLOR,
+                            (GRAPH_WIDTH - 1, GRAPH_HEIGHT - height, 1, height))
+        if self.panel is None or self.count % 30 == 0:
+            self.panel = self.render_panel()
+        rect = surface.blit(source=self.panel, dest=(0, 0))
+        surface.blit(source=self.graph, dest=(4, 4))
+        return rect
+
+    def render_panel(self):
+        """
+        Returns the backdrop of the overlay with the table of percentiles, redrawn every 30 frames.
+        """
+        rows = [('ms', 'p50', 'p95', 'p99')]
+        rows.append(('frame', *(f'{value * 1000:.2f}' for value in self.percentiles(self.frame_times))))
+        for phase in PHASES:
+            rows.append((phase, *(f'{value * 1000:.2f}' for value in self.percentiles(self.times[phase]))))
+
+        panel = pygame.Surface((GRAPH_WIDTH + 8, GRAPH_HEIGHT + ROW_HEIGHT * len(rows) + 12), pygame.SRCALPHA)
+        panel.fill(PANEL_COLOR)
+        budget_y = 4 + GRAPH_HEIGHT - round(self.budget / GRAPH_SCALE * GRAPH_HEIGHT)
+        panel.fill((255, 255, 255, 60), (4, budget_y, GRAPH_WIDTH, 1))  # The frame time at the target FPS
+        for row, cells in enumerate(rows):
+            for column, cell in enumerate(cells):
+                text = self.font.render(cell, True, TEXT_COLOR)
+                x = 4 if column == 0 else 64 + column * 60 - text.get_width()
+                panel.blit(source=text, dest=(x, GRAPH_HEIGHT + 8 + row * ROW_HEIGHT))
+        return panel
+
+    def export(self, path):
+        """
+        Writes the recorded phases to path as Chrome trace events, in microseconds.
+        """
+        trace = [{'name': phase, 'ph': 'X', 'ts': start * 1e6, 'dur': (end - start) * 1e6, 'pid': os.getpid(),
+                  'tid': 0} for phase, start, end in self.events]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, file)
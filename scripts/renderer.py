@@ -0,0 +1,132 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+"""
+
+import pygame
+
+
+class Renderer:
+    """
+    Draws each frame over a static layer and only sends the parts of the screen that changed to the display.
+
+    The layers (the starfield, and for gameplay the starfield with the Sun, the orbit rings and optionally
+    the Sun's gravity field) are composited once. Each frame, begin() paints the layer back over whatever
+    was drawn last frame, everything drawn is reported with add(), and end() updates just those rectangles.
+    The whole screen is redrawn when the scenes on screen change or after invalidate().
+    """
+    def __init__(self, game):
+        self.game = game
+        self.layers = {}
+        self.layer = None  # Layer the last frame was drawn on, with any frozen scenes
+        self.under = None  # Layer under the frozen modal scene
+        self.signature = None  # Scenes the last frame was drawn with
+        self.full = True  # Redraw and update the whole screen this frame
+        self.dirty = []  # Rects drawn this frame
+        self.prev_dirty = []  # Rects drawn last frame
+
+    def invalidate(self):
+        """
+        Rebuilds the layers next frame, for when the window size or the level changes.
+        """
+        self.layers = {}
+        self.full = True
+
+    def build_layers(self):
+        screen = self.game.screen
+        stars = pygame.Surface(screen.get_size()).convert()
+        stars.fill((0, 0, 0))
+        stars.blit(source=self.game.backgrounds['stars_bg']['img'], dest=(-400, 0))
+
+        gameplay = stars.copy()
+        if self.game.show_gravity_field:
+            from scripts.gravity_field import GravityField
+
+            sun = self.game.sun
+            field = GravityField(attractors=[(sun.rect.centerx, sun.rect.centery, sun.mass)],
+                                 width=screen.get_width(), height=screen.get_height(), spacing=8)
+            gameplay.blit(source=field.heat_map(screen.get_size()), dest=(0, 0))
+        self.game.sun.render(surface=gameplay)
+        pygame.draw.circle(surface=gameplay, color=(72, 216, 232),
+                           center=(self.game.sun.rect.centerx, self.game.sun.rect.centery),
+                           radius=self.game.planets['earth'].orbit_radius, width=1)
+        pygame.draw.circle(surface=gameplay, color=(240, 125, 24),
+                           center=(self.game.sun.rect.centerx, self.game.sun.rect.centery),
+                           radius=self.game.planets['mars'].orbit_radius, width=1)
+
+        self.layers = {'stars': stars, 'gameplay': gameplay}
+
+    def begin(self):
+        """
+        Clears what was drawn last frame and returns the scenes to draw this frame. Runs after events are
+        handled, once the frame's state is known.
+
+        Scenes under the top modal scene are frozen, so they and the modal scene itself are drawn once onto
+        the layer when the scenes change. After that, the modal scene only redraws the buttons the mouse
+        moved onto or off.
+        """
+        if not self.layers:
+            self.build_layers()
+        scenes = self.game.scenes
+        if scenes.names != self.signature:
+            self.full = True
+        self.signature = scenes.names
+        stack = scenes.stack
+        modal = max((i for i, scene in enumerate(stack) if scene.modal), default=None)
+        screen = self.game.screen
+
+        if self.full:
+            self.layer = self.layers['gameplay' if 'gameplay' in scenes else 'stars']
+            screen.blit(source=self.layer, dest=(0, 0))
+            if modal is not None:
+                for scene in stack[:modal]:
+                    scene.render()
+                self.under = screen.copy()
+                stack[modal].render()
+                stack[modal].changed.clear()
+                self.layer = screen.copy()
+        else:
+            for rect in self.prev_dirty:
+                screen.blit(source=self.layer, dest=rect, area=rect)
+            if modal is not None:
+                self.redraw_buttons(stack[modal])
+        return stack if modal is None else stack[modal + 1:]
+
+    def redraw_buttons(self, screen):
+        """
+        Redraws the buttons of a frozen modal screen whose hover state changed, on the layer and the display.
+        """
+        for index in screen.changed:
+            rect = screen.button_rects[index]
+            self.layer.set_clip(rect)
+            self.layer.blit(source=self.under, dest=rect, area=rect)
+            screen.render(surface=self.layer)
+            self.layer.set_clip(None)
+            self.game.screen.blit(source=self.layer, dest=rect, area=rect)
+            self.dirty.append(rect)
+        screen.changed.clear()
+
+    def add(self, rects):
+        """
+        Marks a rect, or a list of them, as drawn this frame.
+        """
+        if isinstance(rects, list):
+            self.dirty.extend(rects)
+        elif rects is not None:
+            self.dirty.append(rects)
+
+    def end(self):
+        """
+        Sends the changed parts of the screen to the display.
+        """
+        if self.full:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.prev_dirty + self.dirty)
+        self.prev_dirty = self.dirty
+        self.dirty = []
+        self.full = False
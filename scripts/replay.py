@@ -0,0 +1,148 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Recording and replaying sessions. The game reads each frame's dt, mouse position and input events
+from an input source. A recording keeps the seed the planets were placed with and every frame's
+input, so feeding it back through the same Game plays the session again exactly.
+Run python main.py --record FILE to record, and python main.py --replay FILE [--headless] to replay.
+
+Recordings are a header (magic, version, seed) followed by one record per frame until the end
+of the file: dt, flags, event count, the mouse position if it moved, then the events.
+"""
+
+import struct
+import time
+
+import pygame
+
+MAGIC = b'PHRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHQ')  # Magic, version, seed
+FRAME = struct.Struct('<dBB')  # dt, flags, event count
+MOUSE = struct.Struct('<hh')
+EVENT = struct.Struct('<BI')  # Event code, key or button
+
+MOUSE_MOVED = 1  # Frame flag
+
+# The events the game loop acts on, by the code they are recorded as. Window events only affect drawing.
+EVENT_TYPES = (pygame.QUIT, pygame.MOUSEBUTTONUP, pygame.KEYDOWN, pygame.KEYUP)
+EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+
+class LiveInput:
+    """
+    The clock, mouse and event queue, read once per frame.
+    """
+    limit_fps = True  # Whether the game loop should hold frames to its FPS
+
+    def __init__(self):
+        self.prev_time = time.time()
+
+    def read(self, timeout=0):
+        """
+        Returns this frame's dt, mouse position and events. With a timeout, first waits up to timeout
+        seconds for an event.
+        """
+        events = []
+        if timeout:
+            event = pygame.event.wait(round(timeout * 1000))
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        now = time.time()
+        dt = now - self.prev_time
+        self.prev_time = now
+        return dt, pygame.mouse.get_pos(), events
+
+    def close(self):
+        pass
+
+
+class Recorder(LiveInput):
+    """
+    Live input, written to path as it is read.
+    """
+    def __init__(self, path, seed):
+        super().__init__()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+        self.mouse_pos = None
+
+    def read(self, timeout=0):
+        dt, mouse_pos, events = super().read(timeout)
+        recorded = [event for event in events if event.type in EVENT_CODES]
+        moved = mouse_pos != self.mouse_pos
+        self.mouse_pos = mouse_pos
+        record = [FRAME.pack(dt, MOUSE_MOVED if moved else 0, len(recorded))]
+        if moved:
+            record.append(MOUSE.pack(*mouse_pos))
+        for event in recorded:
+            record.append(EVENT.pack(EVENT_CODES[event.type], getattr(event, 'key', getattr(event, 'button', 0))))
+        self.file.write(b''.join(record))
+        return dt, mouse_pos, events
+
+    def close(self):
+        self.file.close()
+
+
+class Playback:
+    """
+    A recording read back frame by frame. In real time, each frame waits until its dt has passed;
+    otherwise frames follow each other as fast as the game can run them.
+    """
+    def __init__(self, path, realtime=True):
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        magic, version, self.seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} recording')
+        self.offset = HEADER.size
+        self.realtime = realtime
+        self.limit_fps = False
+        self.mouse_pos = (0, 0)
+        self.frames = 0
+        self.recorded_time = 0
+        self.start = time.perf_counter()
+
+    def read(self, timeout=0):
+        """
+        Returns the next frame's dt, mouse position and events, or None once the recording ends.
+        Recorded frames already waited, so timeout is ignored.
+        """
+        if self.offset >= len(self.data):
+            return None
+        dt, flags, count = FRAME.unpack_from(self.data, self.offset)
+        self.offset += FRAME.size
+        events = []
+        if flags & MOUSE_MOVED:
+            self.mouse_pos = MOUSE.unpack_from(self.data, self.offset)
+            self.offset += MOUSE.size
+            events.append(pygame.event.Event(pygame.MOUSEMOTION, pos=self.mouse_pos))
+        for _ in range(count):
+            code, value = EVENT.unpack_from(self.data, self.offset)
+            self.offset += EVENT.size
+            event_type = EVENT_TYPES[code]
+            if event_type in (pygame.KEYDOWN, pygame.KEYUP):
+                events.append(pygame.event.Event(event_type, key=value))
+            elif event_type == pygame.MOUSEBUTTONUP:
+                events.append(pygame.event.Event(event_type, button=value, pos=self.mouse_pos))
+            else:
+                events.append(pygame.event.Event(event_type))
+
+        self.frames += 1
+        self.recorded_time += dt
+        if self.realtime:
+            wait = self.start + self.recorded_time - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        return dt, self.mouse_pos, events
+
+    def close(self):
+        elapsed = time.perf_counter() - self.start
+        print(f'Replayed {self.frames} frames ({self.recorded_time:.1f} s recorded) in {elapsed:.2f} s, '
+              f'{self.frames / max(elapsed, 1e-9):.0f} frames per second')
@@ -0,0 +1,50 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+"""
+
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class RotationCache:
+    """
+    Rotated copies of one image, for drawing it at any heading. Headings are rounded to step degrees
+    (step should divide 360) and each rotation is kept, so a heading is only ever rotated once while it
+    stays among the size most recently used.
+    """
+    def __init__(self, image, step=3, size=120):
+        self.path = image['path']
+        # The colorkey becomes transparency, so rotozoom smooths the edges instead of smearing the key color
+        self.source = image['img'].convert_alpha()
+        self.step = step
+        self.size = size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, heading):
+        """
+        Returns an image dict of the image turned to heading, in radians in screen coordinates
+        (0 is the way the image points, positive is clockwise).
+        """
+        key = round(math.degrees(heading) / self.step) % round(360 / self.step)
+        image = self.cache.get(key)
+        if image is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        # rotozoom turns counterclockwise with y up, the opposite way to screen angles
+        image = {'path': self.path, 'img': pygame.transform.rotozoom(self.source, -key * self.step, 1)}
+        self.cache[key] = image
+        if len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+        return image
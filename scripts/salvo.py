@@ -0,0 +1,174 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Salvos: hundreds of rockets flying at once next to the player's. The rockets and the bodies pulling
+on them are kept as NumPy arrays (one array per quantity, not one object per rocket), so a physics
+step for the whole salvo is a handful of array operations.
+"""
+
+import math
+
+import numpy as np
+
+from scripts.batch_simulation import NO_HIT, collision_mask, fly_sprite_indices, sweep_fractions
+from scripts.preview import PATH_COLOR
+from scripts.simulation import (G, SCALE, TARGET_FPS, SCREEN_WIDTH, SCREEN_HEIGHT, BURN_FACTOR, LAUNCH_SPEED,
+                                LANDING_TOLERANCE)
+from scripts.text import RED, GREEN
+
+LOST_DISTANCE = 2000  # Pixels from the middle of the screen past which a rocket stops being simulated
+
+
+def gravity_field(x, y, center_x, center_y, gm):
+    """
+    Returns the accelerations (ax, ay) of M points at x, y pulled by N attractors, all in one pass.
+    gm is G * mass / SCALE ** 2 per attractor, so like scripts.simulation.gravity the result is in
+    pixels per frame, per frame.
+    """
+    dx = center_x[None, :] - x[:, None]
+    dy = center_y[None, :] - y[:, None]
+    distance = dx * dx + dy * dy
+    np.maximum(distance, 1e-12, out=distance)  # Prevent division by zero
+    pull = gm / (distance * np.sqrt(distance))
+    return (dx * pull).sum(axis=1), (dy * pull).sum(axis=1)
+
+
+def fan(target_angle, spread, count):
+    """
+    Returns count launch angles spread evenly from spread radians either side of target_angle,
+    kept in [-pi, pi) for the fly sprites.
+    """
+    angles = np.linspace(target_angle - spread, target_angle + spread, count)
+    return (angles + math.pi) % (math.pi * 2) - math.pi
+
+
+class Salvo:
+    """
+    Rockets launched together from (x, y), one per target angle, flying like Rocket with the 'euler'
+    integrator until they hit a body. Bodies are given in the order find_collision_object checks
+    them, with their masses, radii and whether they can be landed on.
+
+    hit holds the index of the body each rocket hit, or NO_HIT while it flies or once it is lost.
+    A rocket lands if its velocity at impact matches the body's velocity at the end of the step.
+    Rockets launched mid-flight, already clear of the base planet, start with left_base.
+    """
+    def __init__(self, x, y, target_angles, fly_sizes, masses, radii, landable, centers, base, left_base=False):
+        target_angles = np.asarray(target_angles, dtype=np.float64)
+        count = target_angles.size
+        self.x = np.full(count, float(x))
+        self.y = np.full(count, float(y))
+        self.prev_x = self.x.copy()  # Positions at the previous physics step
+        self.prev_y = self.y.copy()
+        self.vx = LAUNCH_SPEED * np.cos(target_angles)
+        self.vy = LAUNCH_SPEED * np.sin(target_angles)
+        self.width, self.height = np.asarray(fly_sizes, dtype=np.float64)[fly_sprite_indices(target_angles)].T
+
+        self.gm = np.array([G * mass / SCALE ** 2 for mass in masses])
+        self.radius = np.asarray(radii, dtype=np.float64)
+        self.landable = np.asarray(landable, dtype=bool)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.base = base
+
+        self.left_base = np.full(count, left_base, dtype=bool)
+        self.active = np.ones(count, dtype=bool)
+        self.hit = np.full(count, NO_HIT, dtype=np.int8)
+        self.landed = np.zeros(count, dtype=bool)
+
+    def __len__(self):
+        return self.x.size
+
+    def step(self, centers, velocities, h):
+        """
+        Advances every rocket still flying by one physics step of h frames (physics_dt * target_FPS).
+        centers are the bodies' centers after the step and velocities theirs in pixels per second.
+        """
+        prev_centers, self.centers = self.centers, np.asarray(centers, dtype=np.float64)
+        self.prev_x, self.prev_y = self.x.copy(), self.y.copy()
+        live = np.nonzero(self.active)[0]
+        if not live.size:
+            return
+
+        x, y, width, height = self.x[live], self.y[live], self.width[live], self.height[live]
+        prev_vx, prev_vy = self.vx[live], self.vy[live]
+        ax, ay = gravity_field(x + width / 2, y + height / 2, self.centers[:, 0], self.centers[:, 1], self.gm)
+        vx = prev_vx + ax * h
+        vy = prev_vy + ay * h
+        self.vx[live], self.vy[live] = vx, vy
+        self.x[live] = x + BURN_FACTOR * vx * h
+        self.y[live] = y + BURN_FACTOR * vy * h
+
+        # Like Rocket.left_base_planet, from the rect before it moved
+        leaving = np.nonzero(~self.left_base[live])[0]
+        if leaving.size:
+            base_x, base_y = self.centers[self.base]
+            self.left_base[live[leaving]] = ~collision_mask(np.trunc(x[leaving]), np.trunc(y[leaving]),
+                                                            width[leaving], height[leaving], base_x, base_y,
+                                                            self.radius[self.base] + 30)
+
+        # Collisions, swept over the step, for the rocket and body pairs whose swept boxes meet
+        checked = np.nonzero(self.left_base[live])[0]
+        rockets = live[checked]
+        prev_left, prev_top = np.trunc(self.prev_x[rockets]), np.trunc(self.prev_y[rockets])
+        left, top = np.trunc(self.x[rockets]), np.trunc(self.y[rockets])
+        low_x = np.minimum(prev_centers[:, 0], self.centers[:, 0]) - self.radius
+        high_x = np.maximum(prev_centers[:, 0], self.centers[:, 0]) + self.radius
+        low_y = np.minimum(prev_centers[:, 1], self.centers[:, 1]) - self.radius
+        high_y = np.maximum(prev_centers[:, 1], self.centers[:, 1]) + self.radius
+        near, near_body = np.nonzero(
+            ((np.maximum(prev_left, left) + self.width[rockets])[:, None] >= low_x) &
+            (np.minimum(prev_left, left)[:, None] <= high_x) &
+            ((np.maximum(prev_top, top) + self.height[rockets])[:, None] >= low_y) &
+            (np.minimum(prev_top, top)[:, None] <= high_y))
+
+        first = np.full(rockets.size, np.inf)
+        body = np.full(rockets.size, NO_HIT, dtype=np.int8)
+        if near.size:
+            fraction = sweep_fractions(prev_left[near], prev_top[near], left[near], top[near],
+                                       self.width[rockets[near]], self.height[rockets[near]],
+                                       prev_centers[near_body, 0], prev_centers[near_body, 1],
+                                       self.centers[near_body, 0], self.centers[near_body, 1], self.radius[near_body])
+            touching = np.nonzero(np.isfinite(fraction))[0]
+            if touching.size:
+                # The first body touched wins, and the later body of a tie, as in find_collision_object
+                order = np.lexsort((-near_body[touching], fraction[touching], near[touching]))
+                hit_rockets, firsts = np.unique(near[touching][order], return_index=True)
+                chosen = touching[order[firsts]]
+                first[hit_rockets] = fraction[chosen]
+                body[hit_rockets] = near_body[chosen]
+
+        hits = np.nonzero(body != NO_HIT)[0]
+        if hits.size:
+            s = first[hits]
+            bodies = body[hits]
+            velocities = np.asarray(velocities, dtype=np.float64)[bodies]
+            # Rocket velocity at impact in pixels per second, interpolated between the steps as in find_collision
+            rows = checked[hits]
+            raw_x = BURN_FACTOR * TARGET_FPS * (prev_vx[rows] + (vx[rows] - prev_vx[rows]) * s)
+            raw_y = BURN_FACTOR * TARGET_FPS * (prev_vy[rows] + (vy[rows] - prev_vy[rows]) * s)
+            self.hit[rockets[hits]] = bodies
+            self.landed[rockets[hits]] = (self.landable[bodies] &
+                                          (np.abs(raw_x - velocities[:, 0]) <= LANDING_TOLERANCE) &
+                                          (np.abs(raw_y - velocities[:, 1]) <= LANDING_TOLERANCE))
+            self.active[rockets[hits]] = False
+
+        # Rockets far out of the screen would only cost time
+        lost = np.hypot(self.x[live] - SCREEN_WIDTH / 2, self.y[live] - SCREEN_HEIGHT / 2) > LOST_DISTANCE
+        self.active[live[lost]] = False
+
+    def render(self, surface, alpha=1, target=None):
+        """
+        Draws each rocket as a dot at its center, interpolated between the last two physics steps,
+        and returns the rects drawn on. Rockets that landed on body index target are green, and
+        the ones that crashed red.
+        """
+        centers_x = self.prev_x + (self.x - self.prev_x) * alpha + self.width / 2
+        centers_y = self.prev_y + (self.y - self.prev_y) * alpha + self.height / 2
+        colors = [PATH_COLOR, GREEN, RED]
+        color_index = np.where(self.hit == NO_HIT, 0, np.where(self.landed & (self.hit == target), 1, 2))
+        return [surface.fill(colors[color], (x - 1, y - 1, 3, 3))
+                for x, y, color in zip(centers_x.tolist(), centers_y.tolist(), color_index.tolist())]
@@ -0,0 +1,130 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Scenes. What is on screen is a stack of scenes, like the gameplay with the restart and pause buttons
+over it. Only the scenes in the stack are updated and drawn, and input goes to them from the top down.
+Screens (scripts/screen.py) are scenes, and so is Gameplay.
+
+A scene has:
+    modal: whether scenes under it stop getting clicks and updates
+    phase: the profiler phase (scripts/profiler.py) drawing it counts towards
+    update(): runs once per frame
+    render(): draws it, returning the rects drawn on, if any
+    hover(pos): notes where the mouse moved to
+    click(pos): handles a click, returning whether it was used
+    key(event): handles a KEYDOWN or KEYUP event, returning whether it was used
+"""
+
+import pygame
+
+
+class SceneManager:
+    """
+    The stack of scenes on screen, bottom first. Transitions replace the whole stack, or one scene in it.
+    """
+    def __init__(self, scenes):
+        self.scenes = scenes  # Name: scene
+        self.names = ()  # Names of the scenes on screen, bottom first
+        self.stack = []
+        self.pointer = (-1, -1)  # Where the mouse last moved to
+
+    def __contains__(self, name):
+        return name in self.names
+
+    @property
+    def static(self):
+        """
+        Whether nothing on screen changes without input, as a modal scene freezes the scenes under it.
+        """
+        return any(scene.modal for scene in self.stack)
+
+    def set(self, *names):
+        """
+        Shows the scenes with names, bottom first, and nothing else.
+        """
+        self.names = names
+        self.stack = [self.scenes[name] for name in names]
+        for scene in self.stack:
+            scene.hover(self.pointer)
+
+    def replace(self, old, new):
+        """
+        Swaps the scene old for new, in the same place in the stack.
+        """
+        self.set(*(new if name == old else name for name in self.names))
+
+    def update(self):
+        """
+        Updates the scenes from the top down to the first modal one.
+        """
+        for scene in reversed(self.stack):
+            scene.update()
+            if scene.modal:
+                break
+
+    def hover(self, pos):
+        self.pointer = pos
+        for scene in self.stack:
+            scene.hover(pos)
+
+    def click(self, pos):
+        for scene in reversed(self.stack):
+            if scene.click(pos):
+                break
+
+    def key(self, event):
+        # Keys pass modal scenes, so a key let go while paused still counts
+        for scene in reversed(self.stack):
+            if scene.key(event):
+                break
+
+
+class Gameplay:
+    """
+    The level itself: the planets, the rocket and any salvo. Clicking launches the rocket, or sends it
+    a new way while it flies, the arrow keys turn it on Earth, A turns the autopilot on or off and escape
+    pauses the game.
+    """
+    modal = False
+    phase = 'render'
+
+    def __init__(self, game):
+        self.game = game
+
+    def update(self):
+        self.game.step_gameplay()
+
+    def render(self):
+        self.game.render_gameplay()  # Reports what it draws to the renderer itself
+
+    def hover(self, pos):
+        pass
+
+    def click(self, pos):
+        rocket = self.game.rocket
+        if rocket.state['positioning'] or rocket.state['flying']:
+            rocket.state['positioning'] = False
+            rocket.state['setting_trajectory'] = True
+        return True
+
+    def key(self, event):
+        rocket = self.game.rocket
+        if event.key in (pygame.K_RIGHT, pygame.K_LEFT):
+            if rocket.state['positioning']:
+                rocket.movement[0 if event.key == pygame.K_RIGHT else 1] = event.type == pygame.KEYDOWN
+            return True
+        if event.key == pygame.K_a and event.type == pygame.KEYUP:
+            self.game.autopilot.toggle()
+            return True
+        if event.key == pygame.K_ESCAPE and event.type == pygame.KEYUP:
+            if 'pause_screen' in self.game.scenes:
+                self.game.resume()
+            else:
+                self.game.pause()
+            return True
+        return False
@@ -7,52 +7,142 @@ See LICENSE.txt for full GPL-3.0 license information.
 See LICENSES directory for licensing of other works included in this project.
 """
 
+import os
+
 import pygame
 
+from scripts.text import start_title, GREEN
+from scripts.utils import blit_image
+
+
+def button_id(button):
+    """
+    Returns the name handlers know a button by, its image's file name without the extension.
+    """
+    return os.path.splitext(os.path.basename(button['path']))[0]
+
 
 class Screen:
+    """
+    A scene (see scripts/scenes.py) of images, text and buttons. handlers maps button ids to what
+    clicking the button does. A modal screen takes every click and stops the scenes under it updating.
+
+    Button rects are worked out by layout(), and which button the mouse is over by hover(), on mouse
+    motion. changed holds the buttons whose hover state flipped since the renderer last drew them.
+    """
+    phase = 'screens'
+
     def __init__(self, game, buttons: list[dict] = None, hover_buttons: list[dict] = None, images: list = None,
                  btn_positions: list[tuple] = None, img_positions: list[tuple] = None,
-                 background=None, text: list = None):
-        self.buttons = buttons
-        self.rects = {}
-        if buttons is not None:
-            for button in buttons:
-                self.rects[button['path']] = button['img'].get_rect()
+                 background=None, text: list = None, modal=True):
+        self.buttons = buttons if buttons is not None else []
+        self.button_ids = [button_id(button) for button in self.buttons]
+        self.handlers = {}
+        self.modal = modal
         self.hover_buttons = hover_buttons
         self.images = images
-        self.btn_positions = btn_positions
         self.img_positions = img_positions
         self.background = background
         self.text = text
         self.game = game
+        self.hovered = None  # Index of the button the mouse is over
+        self.changed = set()
+        self.layout(btn_positions if btn_positions is not None else [])
+
+    def layout(self, btn_positions):
+        """
+        Places the buttons.
+        """
+        self.btn_positions = btn_positions
+        self.button_rects = [pygame.Rect(position, button['img'].get_size())
+                             for button, position in zip(self.buttons, btn_positions)]
+        self.changed.update(range(len(self.buttons)))
 
-    def render(self):
+    def button_at(self, pos):
+        """
+        Returns the index of the button at pos, or None.
+        """
+        for index, rect in enumerate(self.button_rects):
+            if rect.collidepoint(pos):
+                return index
+        return None
+
+    def hover(self, pos):
+        """
+        Notes which button the mouse at pos is over.
+        """
+        hovered = self.button_at(pos)
+        if hovered != self.hovered:
+            if self.hover_buttons is not None:
+                self.changed.update(index for index in (self.hovered, hovered) if index is not None)
+            self.hovered = hovered
+
+    def render(self, surface=None):
+        """
+        Draws the screen and returns the rects drawn on.
+        """
+        if surface is None:
+            surface = self.game.screen
+        rects = []
         if self.background is not None:
-            self.game.screen.blit(source=self.background['img'], dest=(-1, -1))
+            rects.append(blit_image(surface=surface, image=self.background, dest=(-1, -1)))
 
         if self.hover_buttons is not None:
-            for button, hover_button, position in zip(self.buttons, self.hover_buttons, self.btn_positions):
-                self.rects[button['path']] = pygame.rect.Rect(position[0], position[1],
-                                                              button['img'].get_width(), button['img'].get_height())
-                if self.rects[button['path']].collidepoint(pygame.mouse.get_pos()):
-                    self.game.screen.blit(source=hover_button['img'], dest=position)
-                else:
-                    self.game.screen.blit(source=button['img'], dest=position)
-        elif self.buttons is not None:
+            for index, (button, hover_button, position) in enumerate(zip(self.buttons, self.hover_buttons,
+                                                                         self.btn_positions)):
+                rects.append(blit_image(surface=surface, image=hover_button if index == self.hovered else button,
+                                        dest=position))
+        else:
             for button, position in zip(self.buttons, self.btn_positions):
-                self.game.screen.blit(source=button['img'], dest=position)
-        # Else, do nothing
+                rects.append(blit_image(surface=surface, image=button, dest=position))
 
         if None not in (self.images, self.img_positions):
             for image, position in zip(self.images, self.img_positions):
-                self.game.screen.blit(source=image['img'], dest=position)
+                rects.append(blit_image(surface=surface, image=image, dest=position))
 
         if self.text is not None:
             for text in self.text:
-                self.game.screen.blit(source=text['surf'], dest=text['dest'])
+                rects.append(surface.blit(source=text['surf'], dest=text['dest']))
+
+        return rects
+
+    def update(self):
+        pass
+
+    def click(self, pos):
+        """
+        Runs the handler of the button at pos. Returns whether the click was used.
+        """
+        index = self.button_at(pos)
+        if index is not None and self.button_ids[index] in self.handlers:
+            self.handlers[self.button_ids[index]]()
+            return True
+        return self.modal
+
+    def key(self, event):
+        return False
 
     def current_hover(self):
-        for button in self.buttons:
-            if self.rects[button['path']].collidepoint(pygame.mouse.get_pos()):
-                return button
+        return self.buttons[self.hovered] if self.hovered is not None else None
+
+
+class LoadingScreen:
+    """
+    The title over a progress bar, drawn while the assets load, before there are images for any Screen.
+    """
+    def __init__(self, surface):
+        self.surface = surface
+        self.bar = pygame.Rect(312, 420, 400, 14)
+
+    def render(self, done, total):
+        """
+        Draws done out of total loaded and shows it.
+        """
+        self.surface.fill((0, 0, 0))
+        for text in start_title:
+            self.surface.blit(source=text['surf'], dest=text['dest'])
+        pygame.draw.rect(surface=self.surface, color=GREEN, rect=self.bar, width=1)
+        filled = self.bar.inflate(-6, -6)
+        filled.width = round(filled.width * done / max(total, 1))
+        self.surface.fill(GREEN, filled)
+        pygame.display.update()
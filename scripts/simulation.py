@@ -0,0 +1,786 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+Calculating gravitational forces, in gravity, copyright (C) 2020 user 000Nobody on GitHub
+https://github.com/000Nobody/Orbit-Simulator
+
+The collision function copyright (C) 2014 user Martineau on Stack Overflow
+https://stackoverflow.com/questions/24727773/detecting-rectangle-collision-with-a-circle
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Headless flight simulation. Reproduces the physics of Rocket.update, Planet.update and
+find_collision_object frame by frame using plain data, so launches can be evaluated
+without pygame, a display or the frame loop.
+"""
+
+import math
+import struct
+
+from scripts.broad_phase import SpatialGrid
+from scripts.ephemeris import Orbit, Ephemeris
+
+# Universal gravitational constant
+G = 6.67408 * 10 ** -11
+
+SCALE = 750000000
+
+SCREEN_WIDTH = 1024
+SCREEN_HEIGHT = 720
+
+TARGET_FPS = 120
+
+BASE_IMG_PATH = 'data/images/'
+
+ROCKET_MASS = 2 * (10 ** 6)
+LAUNCH_SPEED = 500000000 / SCALE  # Pixels per frame, same as met_pix(500000000, SCALE)
+
+# Rocket.update sets velocity and initial_velocity to the same list, so every frame the
+# position advances by velocity + initial_velocity, which is twice the velocity.
+BURN_FACTOR = 2
+
+# Largest per-axis difference (pixels per second) between rocket and planet velocities that still lands
+LANDING_TOLERANCE = 51
+
+# Earth is drawn at 55x55 (see ASSETS in scripts/assets.py). Its radius still comes from the
+# original image, so only the rect size changes.
+EARTH_SIZE = (55, 55)
+
+REST_ANGLES = (17, 19, 21, 23, 1, 3, 5, 7, 9, 11, 13, 15)
+FLY_ANGLES = (1, 3, 5, 7, 9, 11)
+
+# Seconds of game time after which launches that have not hit anything are counted as lost in space
+MAX_TIME = 10
+MAX_FRAMES = MAX_TIME * TARGET_FPS
+
+
+# Copyright (C) 2014 Martineau
+def collision(rleft, rtop, width, height,  # rectangle definition
+              center_x, center_y, radius, ):  # circle definition
+    """ Detect collision between a rectangle and circle. """
+
+    # complete boundbox of the rectangle
+    rright, rbottom = rleft + width, rtop + height
+
+    # bounding box of the circle
+    cleft, ctop = center_x - radius, center_y - radius
+    cright, cbottom = center_x + radius, center_y + radius
+
+    # trivial reject if bounding boxes do not intersect
+    if rright < cleft or rleft > cright or rbottom < ctop or rtop > cbottom:
+        return False  # no collision possible
+
+    # check whether any point of rectangle is inside circle's radius
+    for x in (rleft, rleft + width):
+        for y in (rtop, rtop + height):
+            # compare distance between circle's center point and each point of
+            # the rectangle with the circle's radius
+            if math.hypot(x - center_x, y - center_y) <= radius:
+                return True  # collision detected
+
+    # check if center of circle is inside rectangle
+    if rleft <= center_x <= rright and rtop <= center_y <= rbottom:
+        return True  # overlaid
+
+    return False  # no collision detected
+
+
+def sweep(prev_left, prev_top, rleft, rtop, width, height,  # rectangle, moving from prev_left, prev_top
+          prev_center_x, prev_center_y, center_x, center_y, radius):  # circle, moving from prev_center_x, prev_center_y
+    """
+    Continuous version of collision, for a rectangle and a circle that both move in a straight line
+    during a step. Returns the earliest fraction of the step (0 to 1) at which collision would find
+    them touching, or None if it never would. The rectangle keeps its final size throughout.
+    """
+    # Trivial reject if the boxes swept by the rectangle and the circle do not intersect
+    if (max(prev_left, rleft) + width < min(prev_center_x, center_x) - radius or
+            min(prev_left, rleft) > max(prev_center_x, center_x) + radius or
+            max(prev_top, rtop) + height < min(prev_center_y, center_y) - radius or
+            min(prev_top, rtop) > max(prev_center_y, center_y) + radius):
+        return None
+
+    # The circle's center relative to the rectangle's top left corner, c + s * d for s from 0 to 1
+    cx, cy = prev_center_x - prev_left, prev_center_y - prev_top
+    dx, dy = (center_x - rleft) - cx, (center_y - rtop) - cy
+    first = None
+
+    # A corner inside the circle: |corner - c - s * d| <= radius
+    a = dx * dx + dy * dy
+    for x in (0, width):
+        for y in (0, height):
+            ex, ey = x - cx, y - cy
+            c = ex * ex + ey * ey - radius * radius
+            if c <= 0:
+                return 0
+            b = -2 * (ex * dx + ey * dy)
+            discriminant = b * b - 4 * a * c
+            if a and discriminant >= 0:
+                s = (-b - math.sqrt(discriminant)) / (2 * a)
+                if 0 <= s <= 1 and (first is None or s < first):
+                    first = s
+
+    # The circle's center inside the rectangle, on both axes at once
+    low, high = 0, 1
+    for start, delta, size in ((cx, dx, width), (cy, dy, height)):
+        if delta:
+            enter, leave = -start / delta, (size - start) / delta
+            if enter > leave:
+                enter, leave = leave, enter
+            low, high = max(low, enter), min(high, leave)
+        elif not 0 <= start <= size:
+            low, high = 1, 0
+    if low <= high and (first is None or low < first):
+        first = low
+
+    # Rounding can miss a hit that collision itself finds at the end of the step
+    if first is None and collision(rleft=rleft, rtop=rtop, width=width, height=height,
+                                   center_x=center_x, center_y=center_y, radius=radius):
+        first = 1
+    return first
+
+
+class Impact:
+    """
+    When and how fast the rocket hit a body during a step. fraction is how far into the step it hit,
+    time is in seconds like World.time and Game.physics_time, and velocities are in pixels per second.
+    """
+    def __init__(self, body, fraction, time, rocket_velocity, body_velocity):
+        self.body = body
+        self.fraction = fraction
+        self.time = time
+        self.rocket_velocity = rocket_velocity
+        self.body_velocity = body_velocity
+
+
+def velocities_match(rocket_velocity, body_velocity):
+    """
+    Returns True if the rocket came in slow enough relative to the body to land on it.
+    Velocities are in pixels per second.
+    """
+    return (math.fabs(rocket_velocity[0] - body_velocity[0]) <= LANDING_TOLERANCE and
+            math.fabs(rocket_velocity[1] - body_velocity[1]) <= LANDING_TOLERANCE)
+
+
+def read_png_size(path):
+    """
+    Reads the width and height of a PNG file from its header without decoding it.
+    """
+    with open(BASE_IMG_PATH + path, 'rb') as file:
+        header = file.read(24)
+    return struct.unpack('>II', header[16:24])
+
+
+class Body:
+    """
+    A planet or the Sun. Positions follow pygame: x and y are the float top left corner,
+    rect is the integer rect the game would build from them.
+    """
+    def __init__(self, name, mass, size, radius, orbit_radius=0, orbit_rate=0, angle=0):
+        self.name = name
+        self.mass = mass
+        self.width, self.height = size
+        self.radius = radius
+        self.orbit_radius = orbit_radius
+        self.orbit_rate = orbit_rate
+        self.angle = angle
+        self.x = 0
+        self.y = 0
+        self.velocity = (0, 0)
+        self.rect = (0, 0, self.width, self.height)
+        self.centerx = 0
+        self.centery = 0
+        self.place()
+        self.prev_centerx = self.centerx  # Center at the previous physics step, for swept collisions
+        self.prev_centery = self.centery
+
+    def place(self):
+        self.x = math.cos(self.angle) * self.orbit_radius + SCREEN_WIDTH / 2 - self.width / 2
+        self.y = math.sin(self.angle) * self.orbit_radius + SCREEN_HEIGHT / 2 - self.height / 2
+        self.update_rect()
+
+    def update_rect(self):
+        self.rect = (int(self.x), int(self.y), self.width, self.height)
+        self.centerx = self.rect[0] + self.width // 2
+        self.centery = self.rect[1] + self.height // 2
+
+    def orbit(self):
+        """
+        Returns the Orbit the body follows from its current angle.
+        """
+        return Orbit(orbit_radius=self.orbit_radius, angular_velocity=self.orbit_rate * TARGET_FPS, angle=self.angle,
+                     size=(self.width, self.height), center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
+
+    def copy(self):
+        body = Body.__new__(Body)
+        body.__dict__.update(self.__dict__)
+        return body
+
+
+class RocketState:
+    """
+    The rocket's position, velocity and sprite size. The state dict mirrors Rocket.state.
+    """
+    def __init__(self, rest_sizes, fly_sizes, mass=ROCKET_MASS):
+        self.mass = mass
+        self.rest_sizes = rest_sizes
+        self.fly_sizes = fly_sizes
+        self.width, self.height = rest_sizes[0]
+        self.angle = math.pi * 1.5
+        self.target_angle = 0
+        self.x = 0
+        self.y = 0
+        self.velocity = [0, 0]
+        self.raw_velocity = (0, 0)
+        self.prev_raw_velocity = (0, 0)  # At the previous physics step, for swept collisions
+        self.rect = (0, 0, self.width, self.height)
+        self.prev_rect = self.rect
+        self.centerx = 0
+        self.centery = 0
+        self.state = {'left_base_planet': False, 'positioning': True, 'flying': False,
+                      'landing': False, 'crashing': False}
+
+    def update_rect(self):
+        self.rect = (int(self.x), int(self.y), self.width, self.height)
+        self.centerx = self.rect[0] + self.width // 2
+        self.centery = self.rect[1] + self.height // 2
+
+    def copy(self):
+        rocket = RocketState.__new__(RocketState)
+        rocket.__dict__.update(self.__dict__)
+        rocket.velocity = list(self.velocity)
+        rocket.state = dict(self.state)
+        return rocket
+
+
+class Outcome:
+    """
+    Result of a launch, as update_user_won would judge it.
+    body is the name of the body hit, or None if nothing was hit within the frame limit.
+    frame is the step the hit was found in, and time the moment of impact within it, in seconds.
+    """
+    def __init__(self, body=None, landed=False, won=False, frame=0, velocity_diff=(0, 0), time=None):
+        self.body = body
+        self.landed = landed
+        self.won = won
+        self.frame = frame
+        self.velocity_diff = velocity_diff
+        self.time = time
+
+    def __repr__(self):
+        return (f'Outcome(body={self.body!r}, landed={self.landed}, won={self.won}, frame={self.frame}, '
+                f'velocity_diff=({self.velocity_diff[0]:.2f}, {self.velocity_diff[1]:.2f}))')
+
+
+def body_center(body):
+    return body.centerx, body.centery
+
+
+class World:
+    """
+    Everything the flight physics reads: the Sun, the planets in the order the game updates them
+    and the rocket with its base and target planets. The planets follow an Ephemeris starting from
+    their angles when the world is made, tabulated for steps of dt.
+    """
+    def __init__(self, sun, planets, rocket, base_planet='earth', target_planet='mars', dt=1 / TARGET_FPS,
+                 ephemeris=None):
+        self.sun = sun
+        self.planets = planets
+        self.rocket = rocket
+        self.base_planet = base_planet
+        self.target_planet = target_planet
+        self.frame = 0
+        self.time = 0
+        self.outcome = None
+        if ephemeris is None:
+            ephemeris = Ephemeris(orbits={name: planet.orbit() for name, planet in self.planets.items()}, dt=dt,
+                                  frames=round(MAX_TIME / dt))
+        self.ephemeris = ephemeris
+        self._bodies = list(self.planets.values()) + [self.sun]
+        # Broad phase for find_collision, stepped along with the planets
+        self.grid = SpatialGrid(locate=body_center)
+        for body in self._bodies:
+            self.grid.add(body, body.radius, speed=body.orbit_radius * math.fabs(body.orbit_rate) * TARGET_FPS * dt)
+
+    def bodies(self):
+        """
+        Returns the bodies in the order find_collision_object checks them.
+        """
+        return self._bodies
+
+    def copy(self):
+        # The ephemeris only depends on where the planets started, so copies share it and its tables
+        world = World(sun=self.sun.copy(), planets={name: planet.copy() for name, planet in self.planets.items()},
+                      rocket=self.rocket.copy(), base_planet=self.base_planet, target_planet=self.target_planet,
+                      ephemeris=self.ephemeris)
+        world.frame = self.frame
+        world.time = self.time
+        world.outcome = self.outcome
+        return world
+
+
+def default_world(earth_angle=0, mars_angle=0, dt=1 / TARGET_FPS):
+    """
+    Builds the Earth to Mars level with the same bodies as Game.__init__, stepping dt seconds at a time.
+    """
+    earth_width = read_png_size('objects/earth.png')[0]
+    mars_size = read_png_size('objects/mars.png')
+    sun_size = read_png_size('objects/sun.png')
+
+    # Radius subtracts the 3 pixel empty space on all object images, as in Planet and Sun
+    planets = {'earth': Body(name='earth', mass=5.9722 * (10 ** 24), size=EARTH_SIZE, radius=(earth_width - 6) / 2,
+                             orbit_radius=200, orbit_rate=-0.007, angle=earth_angle),
+
+               'mars': Body(name='mars', mass=6.39 * (10 ** 23), size=mars_size, radius=(mars_size[0] - 6) / 2,
+                            orbit_radius=228000000000 / SCALE, orbit_rate=-0.00371, angle=mars_angle),
+               }
+    sun = Body(name='sun', mass=1.9891 * (10 ** 30), size=sun_size, radius=(sun_size[0] - 6) / 2)
+
+    rest_sizes = [read_png_size(f'rocket/rest/rocket_rest_{i:02}.png') for i in range(1, 13)]
+    fly_sizes = [read_png_size(f'rocket/fly/rocket_fly_{i:02}.png') for i in range(1, 13)]
+    rocket = RocketState(rest_sizes=rest_sizes, fly_sizes=fly_sizes)
+
+    return World(sun=sun, planets=planets, rocket=rocket, dt=dt)
+
+
+def world_from_game(game):
+    """
+    Snapshots a running Game into a World, keeping the current positions and velocities.
+    """
+    def snapshot(obj, orbit_radius=0, orbit_rate=0, angle=0):
+        body = Body(name=obj.name, mass=obj.mass, size=obj.rect.size, radius=obj.radius,
+                    orbit_radius=orbit_radius, orbit_rate=orbit_rate, angle=angle)
+        body.x, body.y = obj.x, obj.y
+        body.update_rect()
+        return body
+
+    planets = {}
+    for name, planet in game.planets.items():
+        planets[name] = snapshot(planet, planet.orbit_radius, planet.orbit_rate,
+                                 game.ephemeris.angle_at(name, game.physics_time))
+        planets[name].velocity = tuple(planet.velocity)
+
+    rocket = RocketState(rest_sizes=[image['img'].get_size() for image in game.rocket.rest_images],
+                         fly_sizes=[image['img'].get_size() for image in game.rocket.fly_images],
+                         mass=game.rocket.mass)
+    rocket.angle = game.rocket.angle
+    rocket.target_angle = game.rocket.target_angle
+    rocket.x, rocket.y = game.rocket.x, game.rocket.y
+    rocket.width, rocket.height = game.rocket.rect.size
+    rocket.velocity = list(game.rocket.velocity)
+    rocket.raw_velocity = tuple(game.rocket.raw_velocity)
+    rocket.state = {state: game.rocket.state[state] for state in rocket.state}
+    rocket.update_rect()
+
+    return World(sun=snapshot(game.sun), planets=planets, rocket=rocket,
+                 base_planet=game.rocket.base_planet.name, target_planet=game.rocket.target_planet.name,
+                 dt=game.physics_dt)
+
+
+def _search_rest_sprite(angle):
+    """
+    The rest image index and rim angle, by the chain of comparisons Rocket.update_image used.
+    Only used to build REST_SPRITES.
+    """
+    for i, val in enumerate(REST_ANGLES):
+        if i != 4:
+            if (math.pi / 12) * REST_ANGLES[i - 1] <= angle < (math.pi / 12) * val:
+                return i - 1 if i else len(REST_ANGLES) - 1, (math.pi / 12) * (val - 1)
+        else:
+            if (math.pi / 12) * 23 <= angle < math.pi * 2 or 0 <= angle < math.pi / 12:
+                return 3, 0
+
+
+def _search_fly_sprite(target_angle):
+    """
+    The fly image index, by the chain of comparisons Rocket.update_image used. Only used to build FLY_SPRITES.
+    """
+    if -1 * (math.pi / 12) < target_angle <= (math.pi / 12):
+        return 0
+    elif (math.pi / 12) < target_angle <= (math.pi / 12) * 11:
+        for i, val in enumerate(FLY_ANGLES):
+            if (math.pi / 12) * (val - 2) < target_angle <= (math.pi / 12) * val:
+                return i
+    elif -1 * (math.pi / 12) * 11 < target_angle <= -1 * (math.pi / 12):
+        for i, val in enumerate(FLY_ANGLES):
+            if -1 * (math.pi / 12) * val < target_angle <= -1 * (math.pi / 12) * (val - 2):
+                return 12 - i
+    return 6
+
+
+SECTOR = math.pi / 12
+SECTORS = 24
+
+
+def sector(angle, ceil=False):
+    """
+    Returns k for the pi / 12 wide sector [k, k + 1) the angle is in, or (k - 1, k] with ceil. Checked
+    against (math.pi / 12) * k like the original comparisons, so angles on a boundary land on the same side.
+    """
+    if ceil:
+        k = math.ceil(angle / SECTOR)
+        if angle <= SECTOR * (k - 1):
+            k -= 1
+        elif angle > SECTOR * k:
+            k += 1
+    else:
+        k = math.floor(angle / SECTOR)
+        if angle < SECTOR * k:
+            k -= 1
+        elif angle >= SECTOR * (k + 1):
+            k += 1
+    return k
+
+
+# Sprite choices by sector, taken once from the middle of every sector.
+# (rest image index, rim angle) for each sector [k, k + 1) of the rocket's angle on the rim, k from 0 to 23
+REST_SPRITES = tuple(_search_rest_sprite((k + 0.5) * SECTOR) for k in range(SECTORS))
+# Fly image index for each sector (k - 1, k] of the launch angle, at index k + 12 for k from -12 to 12
+FLY_SPRITES = tuple(_search_fly_sprite((k - 0.5) * SECTOR) for k in range(-SECTORS // 2, SECTORS // 2 + 1))
+# Rest image index a rocket lands with, by the fly image index it came in with
+LANDING_SPRITES = tuple((i + 3) % len(REST_ANGLES) for i in range(len(REST_ANGLES)))
+
+
+def rim_sprite(angle):
+    """
+    Returns the rest image index and the rim angle (radians) Rocket.update_image uses for a rocket
+    positioned at angle on its base planet. 2pi counts as 0.
+    """
+    return REST_SPRITES[sector(angle) % SECTORS]
+
+
+def fly_sprite_index(target_angle):
+    """
+    Returns the index of the fly image Rocket.update_image shows for a launch angle in [-pi, pi].
+    """
+    return FLY_SPRITES[sector(target_angle, ceil=True) + SECTORS // 2]
+
+
+def rim_offset(base_size, size, rim_angle):
+    """
+    Returns where the top left corner of a rocket image of the given size sits on the rim of its base
+    planet, relative to the planet's top left corner.
+    """
+    base_width, base_height = base_size
+    width, height = size
+    return (math.cos(rim_angle) * (base_width / 2 + 3) + base_width / 2 - width / 2,
+            math.sin(rim_angle) * (base_height / 2 + 3) + base_height / 2 - height / 2)
+
+
+def rim_table(base_size, rest_sizes):
+    """
+    Returns, for each sector of the rocket's angle on the rim, its rest image index and its offset
+    from the base planet, as (index, x, y). Index it with sector(angle) % SECTORS.
+    """
+    return tuple((sprite,) + rim_offset(base_size, rest_sizes[sprite], rim_angle)
+                 for sprite, rim_angle in REST_SPRITES)
+
+
+def position_on_rim(world, angle):
+    """
+    Places the rocket on the rim of its base planet, as Rocket.update_image does while positioning.
+    """
+    rocket = world.rocket
+    base = world.planets[world.base_planet]
+    rocket.angle = angle
+
+    sprite, rim_angle = rim_sprite(angle)
+    rocket.width, rocket.height = rocket.rest_sizes[sprite]
+    offset_x, offset_y = rim_offset((base.width, base.height), rocket.rest_sizes[sprite], rim_angle)
+    rocket.x = offset_x + base.rect[0]
+    rocket.y = offset_y + base.rect[1]
+    rocket.update_rect()
+
+
+def launch(world, target_angle):
+    """
+    Fires the rocket towards target_angle (radians, screen coordinates), like clicking does.
+    Also used for course corrections while flying.
+    """
+    rocket = world.rocket
+    rocket.target_angle = target_angle
+    rocket.velocity = [LAUNCH_SPEED * math.cos(target_angle), LAUNCH_SPEED * math.sin(target_angle)]
+    rocket.state['positioning'] = False
+    rocket.state['flying'] = True
+
+
+def aim_angle(world, target_pos):
+    """
+    Returns the launch angle towards a screen position, as Rocket.update computes it from the mouse.
+    """
+    return math.atan2(target_pos[1] - world.rocket.centery, target_pos[0] - world.rocket.centerx)
+
+
+def place_planets(world, t):
+    """
+    Moves the planets to where they are t seconds after the world was made. Takes the same time
+    for any t, so there is no need to step through the frames in between.
+    """
+    for name, planet in world.planets.items():
+        planet.prev_centerx, planet.prev_centery = planet.centerx, planet.centery
+        planet.x, planet.y, velocity_x, velocity_y = world.ephemeris.state(name, t)
+        planet.velocity = (velocity_x, velocity_y)
+        planet.angle = world.ephemeris.angle_at(name, t)
+        planet.update_rect()
+
+
+def gravity(x, y, attractors):
+    """
+    Returns the acceleration (pixels per frame, per frame) at a point in pixels, pulled by
+    attractors given as (center x, center y, mass).
+    """
+    ax = 0
+    ay = 0
+    # Calculating gravitational force copyright (C) 2020 000Nobody on GitHub. Reworked to use the
+    # direction vector over the cube of the distance instead of atan2, cos and sin, with distances in
+    # pixels: G * M / (d * SCALE) ** 2 along (dx, dy) / d is G * M / SCALE ** 2 * (dx, dy) / d ** 3.
+    for center_x, center_y, mass in attractors:
+        dx = center_x - x
+        dy = center_y - y
+
+        d = math.sqrt(dx * dx + dy * dy)  # Calculate distance
+        if d == 0:
+            d = 0.000001 / SCALE  # Prevent division by zero error
+
+        pull = G * mass / SCALE ** 2 / (d * d * d)  # Calculate gravitational acceleration, over the distance
+
+        ax += dx * pull
+        ay += dy * pull
+    return ax, ay
+
+
+# Integrators advance a position (x, y) and velocity (vx, vy) by h frames under acceleration(x, y).
+# Position moves at BURN_FACTOR times the velocity.
+
+def euler(x, y, vx, vy, h, acceleration):
+    """
+    Semi-implicit Euler, the game's original method. Symplectic but first order.
+    """
+    ax, ay = acceleration(x, y)
+    vx += ax * h
+    vy += ay * h
+    return x + BURN_FACTOR * vx * h, y + BURN_FACTOR * vy * h, vx, vy
+
+
+def verlet(x, y, vx, vy, h, acceleration):
+    """
+    Velocity Verlet (kick-drift-kick leapfrog). Symplectic and second order, so it stays stable
+    on close passes with far bigger steps than Euler.
+    """
+    ax, ay = acceleration(x, y)
+    vx += ax * h / 2
+    vy += ay * h / 2
+    x += BURN_FACTOR * vx * h
+    y += BURN_FACTOR * vy * h
+    ax, ay = acceleration(x, y)
+    return x, y, vx + ax * h / 2, vy + ay * h / 2
+
+
+def rk4(x, y, vx, vy, h, acceleration):
+    """
+    Classic fourth order Runge-Kutta. Most accurate per step, but not symplectic and four
+    acceleration evaluations per step.
+    """
+    k1x, k1y = BURN_FACTOR * vx, BURN_FACTOR * vy
+    a1x, a1y = acceleration(x, y)
+    k2x, k2y = BURN_FACTOR * (vx + a1x * h / 2), BURN_FACTOR * (vy + a1y * h / 2)
+    a2x, a2y = acceleration(x + k1x * h / 2, y + k1y * h / 2)
+    k3x, k3y = BURN_FACTOR * (vx + a2x * h / 2), BURN_FACTOR * (vy + a2y * h / 2)
+    a3x, a3y = acceleration(x + k2x * h / 2, y + k2y * h / 2)
+    k4x, k4y = BURN_FACTOR * (vx + a3x * h), BURN_FACTOR * (vy + a3y * h)
+    a4x, a4y = acceleration(x + k3x * h, y + k3y * h)
+    return (x + (k1x + 2 * k2x + 2 * k3x + k4x) * h / 6,
+            y + (k1y + 2 * k2y + 2 * k3y + k4y) * h / 6,
+            vx + (a1x + 2 * a2x + 2 * a3x + a4x) * h / 6,
+            vy + (a1y + 2 * a2y + 2 * a3y + a4y) * h / 6)
+
+
+INTEGRATORS = {'euler': euler, 'verlet': verlet, 'rk4': rk4}
+
+
+def rocket_acceleration(width, height, attractors):
+    """
+    Returns an acceleration function of the rocket's top left corner, pulling on its center.
+    """
+    def acceleration(x, y):
+        return gravity(x + width / 2, y + height / 2, attractors)
+    return acceleration
+
+
+def step_rocket(world, dt, integrator='euler'):
+    rocket = world.rocket
+    if not rocket.state['flying']:
+        return
+
+    rocket.prev_rect = rocket.rect
+    rocket.prev_raw_velocity = rocket.raw_velocity
+    attractors = [(body.centerx, body.centery, body.mass) for body in world.bodies()]
+    rocket.x, rocket.y, rocket.velocity[0], rocket.velocity[1] = INTEGRATORS[integrator](
+        rocket.x, rocket.y, rocket.velocity[0], rocket.velocity[1], dt * TARGET_FPS,
+        rocket_acceleration(rocket.width, rocket.height, attractors))
+
+    # Rocket.left_base_planet runs before the rect is moved
+    if not rocket.state['left_base_planet']:
+        base = world.planets[world.base_planet]
+        if not collision(rleft=rocket.rect[0], rtop=rocket.rect[1], width=rocket.width, height=rocket.height,
+                         center_x=base.centerx, center_y=base.centery, radius=base.radius + 30):
+            rocket.state['left_base_planet'] = True
+
+    # Pixels per second. The position moves BURN_FACTOR times the velocity, which is in pixels per TARGET_FPS frame.
+    rocket.raw_velocity = (BURN_FACTOR * rocket.velocity[0] * TARGET_FPS,
+                           BURN_FACTOR * rocket.velocity[1] * TARGET_FPS)
+    rocket.width, rocket.height = rocket.fly_sizes[fly_sprite_index(rocket.target_angle)]
+    rocket.update_rect()
+
+
+def find_collision(world, dt=1 / TARGET_FPS):
+    """
+    Returns the Impact of the rocket with the first body it touched during the last step of dt
+    seconds, or None. Both the rocket and the bodies are swept from where they were at the previous
+    step, so a fast rocket can't pass through a body between steps. Bodies hit at the same moment go
+    in the order find_collision_object checks them, the Sun last, and the last one wins.
+    """
+    rocket = world.rocket
+    prev_left, prev_top = rocket.prev_rect[0], rocket.prev_rect[1]
+    rleft, rtop = rocket.rect[0], rocket.rect[1]
+    hit = None
+    first = None
+    for body in world.grid.query(min(prev_left, rleft), min(prev_top, rtop),
+                                 max(prev_left, rleft) + rocket.width, max(prev_top, rtop) + rocket.height):
+        fraction = sweep(prev_left=prev_left, prev_top=prev_top, rleft=rleft, rtop=rtop,
+                         width=rocket.width, height=rocket.height,
+                         prev_center_x=body.prev_centerx, prev_center_y=body.prev_centery,
+                         center_x=body.centerx, center_y=body.centery, radius=body.radius)
+        if fraction is not None and (first is None or fraction <= first):
+            hit, first = body, fraction
+    if hit is None:
+        return None
+
+    time = world.time - dt * (1 - first)
+    rocket_velocity = (rocket.prev_raw_velocity[0] + (rocket.raw_velocity[0] - rocket.prev_raw_velocity[0]) * first,
+                       rocket.prev_raw_velocity[1] + (rocket.raw_velocity[1] - rocket.prev_raw_velocity[1]) * first)
+    if hit.name in world.planets:
+        body_velocity = world.ephemeris.state(hit.name, time)[2:]
+    else:
+        body_velocity = hit.velocity
+    return Impact(body=hit, fraction=first, time=time, rocket_velocity=rocket_velocity, body_velocity=body_velocity)
+
+
+def judge(world, impact):
+    """
+    Evaluates a collision the same way update_user_won does and ends the flight.
+    """
+    rocket = world.rocket
+    body = impact.body
+    if body.name == 'sun':
+        landed = False
+        velocity_diff = (0, 0)
+    else:
+        landed = velocities_match(impact.rocket_velocity, impact.body_velocity)
+        velocity_diff = (math.fabs(impact.rocket_velocity[0] - impact.body_velocity[0]),
+                         math.fabs(impact.rocket_velocity[1] - impact.body_velocity[1]))
+
+    for state in rocket.state:
+        rocket.state[state] = False
+    if landed:
+        rocket.state['landing'] = True
+    else:
+        rocket.state['crashing'] = True
+
+    return Outcome(body=body.name, landed=landed, won=landed and body.name == world.target_planet,
+                   frame=world.frame, velocity_diff=velocity_diff, time=impact.time)
+
+
+def step(world, dt=1 / TARGET_FPS, integrator='euler'):
+    """
+    Advances the world by one physics step of dt seconds, in the order Game.update_gameplay runs:
+    planets, then the rocket, then collisions. Returns the Outcome once the rocket hits something.
+    """
+    if world.outcome is not None:
+        return world.outcome
+
+    world.frame += 1
+    world.time += dt
+    place_planets(world, world.time)
+    world.grid.step()
+    step_rocket(world, dt, integrator)
+
+    if world.rocket.state['left_base_planet']:
+        impact = find_collision(world, dt)
+        if impact is not None:
+            world.outcome = judge(world, impact)
+    return world.outcome
+
+
+def new_launch_world(earth_angle, mars_angle, rim_angle, dt=1 / TARGET_FPS):
+    """
+    Returns a world with the planets at the given angles and the rocket positioned on Earth's rim,
+    as it is the frame before the player clicks.
+    """
+    world = default_world(earth_angle=earth_angle, mars_angle=mars_angle, dt=dt)
+    place_planets(world, 0)
+    world.grid.refile_all()
+    position_on_rim(world, rim_angle)
+    return world
+
+
+class Trace:
+    """
+    Records the path of a launch a slice of frames at a time, so it can be spread over several
+    frames or run on another thread. points are the rocket's centers, every few frames.
+    """
+    def __init__(self, world, target_angle, dt=1 / TARGET_FPS, max_frames=None, integrator='euler', every=2):
+        self.world = world
+        self.dt = dt
+        self.max_frames = round(MAX_TIME / dt) if max_frames is None else max_frames
+        self.integrator = integrator
+        self.every = every
+        self.outcome = None
+        self.done = False
+        launch(world, target_angle)
+        self.points = [self.center()]
+
+    def center(self):
+        rocket = self.world.rocket
+        return rocket.x + rocket.width / 2, rocket.y + rocket.height / 2
+
+    def advance(self, frames):
+        """
+        Simulates up to frames more frames. Returns True once the launch has ended.
+        """
+        world = self.world
+        for _ in range(frames):
+            if self.done:
+                break
+            outcome = step(world, self.dt, self.integrator)
+            if outcome is not None or not world.frame % self.every:
+                self.points.append(self.center())
+            if outcome is not None or world.frame >= self.max_frames:
+                self.outcome = outcome if outcome is not None else Outcome(frame=world.frame)
+                self.done = True
+        return self.done
+
+
+def simulate_launch(earth_angle, mars_angle, rim_angle, target_angle, dt=1 / TARGET_FPS, max_frames=None,
+                    integrator='euler', world=None):
+    """
+    Simulates a whole launch headlessly and returns its Outcome.
+
+    Angles are in radians. earth_angle and mars_angle are the planets' orbit angles, rim_angle is the
+    rocket's angle on Earth's rim (Rocket.angle) and target_angle is the launch direction
+    (Rocket.target_angle). max_frames defaults to MAX_TIME seconds of steps and integrator is a key
+    of INTEGRATORS. A prepared world can be passed instead to reuse it.
+    """
+    if world is None:
+        world = new_launch_world(earth_angle, mars_angle, rim_angle, dt)
+    if max_frames is None:
+        max_frames = round(MAX_TIME / dt)
+    launch(world, target_angle)
+
+    while world.frame < max_frames:
+        outcome = step(world, dt, integrator)
+        if outcome is not None:
+            return outcome
+    return Outcome(frame=world.frame)
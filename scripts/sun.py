@@ -9,6 +9,8 @@ See LICENSES directory for licensing of other works included in this project.
 
 import pygame
 
+from scripts.utils import blit_image
+
 
 class Sun:
     def __init__(self, image, mass, game):
@@ -21,5 +23,7 @@ class Sun:
         self.y = game.screen.get_height() / 2 - image['img'].get_height() / 2
         self.rect = pygame.Rect(self.x, self.y, self.image['img'].get_width(), self.image['img'].get_height())
 
-    def render(self):
-        self.game.screen.blit(source=self.image['img'], dest=(self.x, self.y))
+    def render(self, surface=None):
+        if surface is None:
+            surface = self.game.screen
+        return blit_image(surface=surface, image=self.image, dest=(self.x, self.y))
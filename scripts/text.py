@@ -5,17 +5,118 @@ SPDX-License-Identifier: GPL-3.0-or-later
 See main.py for the full GPL-3.0 license header.
 See LICENSE.txt for full GPL-3.0 license information.
 See LICENSES directory for licensing of other works included in this project.
+
+Text. Fonts and rendered strings come from a TextCache, so a string is only rasterized the first time
+it is drawn in a given font, size and color. Readouts that change every frame, like numbers, are drawn
+a character at a time from a GlyphAtlas instead, which never rasterizes once built.
 """
 
+from collections import OrderedDict
+
 import pygame
 
 pygame.font.init()
 
+
+class TextCache:
+    """
+    Fonts by (file, size), and the last capacity strings rendered, by (file, size, text, color).
+    A file of None is pygame's default font. The least recently drawn string is dropped first.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """
+        Drops every font and string. Fonts don't survive pygame.quit(), so this runs before it.
+        """
+        self.fonts.clear()
+        self.surfaces.clear()
+
+    def font(self, file, size):
+        key = (file, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(file, size)
+        return self.fonts[key]
+
+    def render(self, text, file=None, size=30, color=(255, 255, 255)):
+        """
+        Returns text rendered antialiased in the font file at size, in color.
+        """
+        key = (file, size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font(file, size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class GlyphAtlas:
+    """
+    The characters of a font, size and color rendered once, side by side on one surface. Strings are
+    drawn from it a character at a time, without kerning, so it suits digits and short labels, which
+    most fonts give equal widths anyway. Characters that aren't in the atlas come from the text cache.
+    """
+    def __init__(self, file=None, size=30, color=(255, 255, 255), characters='0123456789.,:-+ ', cache=None):
+        self.cache = cache if cache is not None else text_cache
+        self.file = file
+        self.size = size
+        self.color = color
+        font = self.cache.font(file, size)
+        self.height = font.get_height()
+        glyphs = [font.render(character, True, color) for character in characters]
+        self.surface = pygame.Surface((sum(glyph.get_width() for glyph in glyphs), self.height), pygame.SRCALPHA)
+        self.areas = {}  # Character: (Rect of its glyph on surface, width)
+        x = 0
+        for character, glyph in zip(characters, glyphs):
+            self.surface.blit(source=glyph, dest=(x, 0))
+            self.areas[character] = (pygame.Rect(x, 0, glyph.get_width(), self.height), glyph.get_width())
+            x += glyph.get_width()
+
+    def layout(self, text, dest, blits):
+        """
+        Adds the blits that draw text with its top left at dest to the list blits, for Surface.blits(), so
+        several strings can be drawn in one call. Returns the rect they draw on.
+        """
+        x, y = dest
+        for character in text:
+            glyph = self.areas.get(character)
+            if glyph is None:
+                image = self.cache.render(character, self.file, self.size, self.color)
+                blits.append((image, (x, y)))
+                x += image.get_width()
+            else:
+                blits.append((self.surface, (x, y), glyph[0]))
+                x += glyph[1]
+        return pygame.Rect(dest[0], y, x - dest[0], self.height)
+
+    def draw(self, surface, text, dest):
+        """
+        Draws text with its top left at dest. Returns the rect drawn on.
+        """
+        blits = []
+        rect = self.layout(text, dest, blits)
+        surface.blits(blits, doreturn=False)
+        return rect
+
+
+text_cache = TextCache()
+
 # htp = how_to_play. Renders the fonts used in the game.
-start_text = pygame.font.Font('fonts/darkstar.ttf', 100)
-htp_title_text = pygame.font.Font('fonts/darkstar.ttf', 50)
-htp_text = pygame.font.Font('fonts/darkstar.ttf', 20)
-velocity_diff_text = pygame.font.Font(None, 30)
+start_text = text_cache.font('fonts/darkstar.ttf', 100)
+htp_title_text = text_cache.font('fonts/darkstar.ttf', 50)
+htp_text = text_cache.font('fonts/darkstar.ttf', 20)
+velocity_diff_text = text_cache.font(None, 30)
 
 # Colors used in the game
 RED = (207, 35, 64)
@@ -29,7 +29,7 @@ def load_images(path, convert):
     if convert == 'convert()':
         for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
             images.append(load_image(path + '/' + img_name, 'convert()'))
-    if convert == 'convert_alpha()':
+    elif convert == 'convert_alpha()':
         for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
             images.append(load_image(path + '/' + img_name, 'convert_alpha()'))
     else:
@@ -38,6 +38,15 @@ def load_images(path, convert):
     return images
 
 
+def blit_image(surface, image, dest):
+    """
+    Blits an image dict, from its area of the shared atlas if it is packed in one. Returns the rect drawn on.
+    """
+    if 'atlas' in image:
+        return surface.blit(source=image['atlas'], dest=dest, area=image['area'])
+    return surface.blit(source=image['img'], dest=dest)
+
+
 def resize_image(image, size):
     return pygame.transform.scale(surface=image, size=size)
 
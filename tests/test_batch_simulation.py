@@ -0,0 +1,35 @@
+"""
+SPDX-FileCopyrightText: 2024, Jason Treakle, thetreakle@gmail.com
+SPDX-License-Identifier: GPL-3.0-or-later
+
+See main.py for the full GPL-3.0 license header.
+See LICENSE.txt for full GPL-3.0 license information.
+See LICENSES directory for licensing of other works included in this project.
+
+Checks that the batch simulation agrees with scripts/simulation.py. Run python -m pytest from the top of
+the repository.
+"""
+
+import math
+
+import numpy as np
+
+from scripts.batch_simulation import rim_sprites, simulate_launches
+from scripts.simulation import MAX_TIME, rim_sprite, simulate_launch
+
+
+def test_rim_sprites_wrap_at_two_pi():
+    # Rocket.angle reaches 2pi when turned right on Earth
+    angles = [0, math.pi * 2, math.nextafter(math.pi * 2, math.inf), math.pi * 2 + 0.1, math.pi * 4 - 0.01]
+    sprites, rims = rim_sprites(np.array(angles))
+    assert list(zip(sprites.tolist(), rims.tolist())) == [tuple(rim_sprite(angle)) for angle in angles]
+
+
+def test_time_limit_follows_dt():
+    # Launched up and to the left from the top of Earth, the rocket is still flying after MAX_TIME
+    dt = 1 / 30
+    batch = simulate_launches(earth_angles=0, mars_angles=math.pi, rim_angles=math.pi * 1.5,
+                              target_angles=-math.pi * 0.75, dt=dt)
+    scalar = simulate_launch(0, math.pi, math.pi * 1.5, -math.pi * 0.75, dt=dt)
+    assert scalar.body is None and batch.body_names() == [None]
+    assert batch.frame.tolist() == [scalar.frame] == [round(MAX_TIME / dt)]